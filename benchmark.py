@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Entity counts per customer at every scale. Lookups scan the customer table,
+# so that is what grows to 1M; the other tables keep a fixed ratio so the
+# largest dataset still fits in memory.
+SCALE_RATIOS = {
+    "appointments": 0.1,
+    "orders": 0.02,
+}
+
+
+def sizes_for(customers):
+    return {
+        "customers": customers,
+        "appointments": max(1, int(customers * SCALE_RATIOS["appointments"])),
+        "orders": max(1, int(customers * SCALE_RATIOS["orders"])),
+        "billing_months": 6,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(times):
+    times = sorted(times)
+    return {
+        "iterations": len(times),
+        "mean": sum(times) / len(times),
+        "median": times[len(times) // 2],
+        "min": times[0],
+        "p95": times[min(len(times) - 1, int(0.95 * len(times)))],
+    }
+
+
+async def time_calls(call, min_time, max_iterations):
+    """Call repeatedly for at least min_time seconds (and at least once), up to max_iterations."""
+    times = []
+    started = time.perf_counter()
+    while not times or (len(times) < max_iterations and time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        result = call()
+        if asyncio.iscoroutine(result):
+            await result
+        times.append(time.perf_counter() - t)
+    return summarize(times)
+
+
+def function_cases(data):
+    """Representative calls for every FUNCTION_MAP entry, aimed at the last customer (the worst case for a scan)."""
+    from common.agent_functions import FUNCTION_MAP
+
+    customer = data["customers"][-1]
+    customer_id = customer["id"]
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0).isoformat()
+    params = {
+        "find_customer": {"customer_id": customer_id},
+        "get_appointments": {"customer_id": customer_id},
+        "get_contracts": {"customer_id": customer_id},
+        "get_billing_history": {"customer_id": customer_id},
+        "get_usage_data": {"customer_id": customer_id, "days": 30},
+        "get_usage_insights": {"customer_id": customer_id},
+        "get_payment_methods": {"customer_id": customer_id},
+        "create_appointment": {"customer_id": customer_id, "date": start, "service": "Bill Review"},
+        "check_availability": {"start_date": start},
+        "agent_filler": {"message_type": "lookup"},
+        "end_call": {"farewell_type": "general"},
+        "handle_customer_complaint": {"customer_id": customer_id, "complaint_details": "Benchmark complaint"},
+        "request_service_connection": {
+            "customer_name": customer["name"],
+            "phone": customer["phone"],
+            "email": customer["email"],
+            "address": customer["address"],
+            "service_type": "upgrade",
+            "details": "Benchmark request",
+        },
+    }
+    missing = set(FUNCTION_MAP) - set(params)
+    if missing:
+        raise SystemExit(f"No benchmark parameters for {sorted(missing)}; add them to function_cases()")
+
+    cases = {}
+    for name, func in FUNCTION_MAP.items():
+        if name in ("agent_filler", "end_call"):
+            cases[name] = lambda func=func, p=params[name]: func(None, p)
+        else:
+            cases[name] = lambda func=func, p=params[name]: func(p)
+    cases["find_customer[phone]"] = lambda: FUNCTION_MAP["find_customer"]({"phone": customer["phone"]})
+    cases["find_customer[email]"] = lambda: FUNCTION_MAP["find_customer"]({"email": customer["email"]})
+    return cases
+
+
+async def benchmark_scale(customers, min_time, max_iterations):
+    from common import business_logic
+
+    sizes = sizes_for(customers)
+    random.seed(customers)
+    started = time.perf_counter()
+    data = business_logic.generate_mock_data(sizes, save=False)
+    functions = {"generate_mock_data": summarize([time.perf_counter() - started])}
+
+    # Swap the dataset in place so every module sees it
+    business_logic.MOCK_DATA.clear()
+    business_logic.MOCK_DATA.update(data)
+
+    for name, call in function_cases(data).items():
+        functions[name] = await time_calls(call, min_time, max_iterations)
+        print(f"  {name:<28} {functions[name]['median'] * 1000:10.3f} ms  ({functions[name]['iterations']} runs)")
+
+    functions["save_complaint"] = await time_calls(
+        lambda: business_logic.save_complaint("Benchmark", "Block 1", "Benchmark complaint"), min_time, max_iterations
+    )
+    functions["save_mock_data"] = await time_calls(
+        lambda: business_logic.save_mock_data(business_logic.MOCK_DATA), min_time, max_iterations
+    )
+    for name in ("generate_mock_data", "save_complaint", "save_mock_data"):
+        print(f"  {name:<28} {functions[name]['median'] * 1000:10.3f} ms  ({functions[name]['iterations']} runs)")
+
+    return {
+        "sizes": sizes,
+        "rows": {table: len(rows) for table, rows in data.items() if isinstance(rows, list)},
+        "functions": functions,
+    }
+
+
+def compare(baseline, current):
+    print(f"\n{'scale':>8} {'function':<28} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for scale, result in current["results"].items():
+        base = baseline["results"].get(scale)
+        if not base:
+            continue
+        for name, stats in result["functions"].items():
+            if name in base["functions"]:
+                before = base["functions"][name]["median"]
+                after = stats["median"]
+                ratio = after / before if before else float("inf")
+                print(f"{scale:>8} {name:<28} {before * 1000:12.3f} {after * 1000:12.3f} {ratio:7.2f}")
+
+
+def main(args):
+    # Everything the business logic writes (mock data files, complaints.csv) goes to a
+    # scratch directory. The common modules are imported only after the chdir because
+    # importing business_logic generates and saves the default dataset.
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="voice_agent_bench_")
+    os.chdir(workdir)
+    try:
+        from common.config import ARTIFICIAL_DELAY
+
+        for delay_type in ARTIFICIAL_DELAY:
+            ARTIFICIAL_DELAY[delay_type] = 0.0
+
+        results = {}
+        for customers in args.scales:
+            print(f"\nScale: {customers} customers")
+            results[str(customers)] = asyncio.run(benchmark_scale(customers, args.min_time, args.max_iterations))
+            gc.collect()
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time,
+            "max_iterations": args.max_iterations,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time every agent function and the mock data helpers at several dataset sizes"
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 100000, 1000000], help="Customer counts")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend timing each function")
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--output", help="Results file (default benchmark_results/business_logic_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = main(args)
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmark_results", f"business_logic_{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -1,40 +1,70 @@
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request
 from flask_socketio import SocketIO
-import sounddevice as sd
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    # PortAudio is not installed; only headless sessions (see load_test.py) can run
+    sd = None
 import numpy as np
 import asyncio
 import websockets
 import os
 import json
 import threading
-import janus
-import queue
+import atexit
 import sys
 import time
 from datetime import datetime
-from common.agent_functions import FUNCTION_DEFINITIONS, FUNCTION_MAP
+from common.agent_functions import FUNCTION_DEFINITIONS
 import logging
 from common.business_logic import MOCK_DATA
-from common.log_formatter import CustomFormatter
+from common.audio_io import BrowserAudioTransport
+from common.auto_filler import AutoFiller
+from common.config import (
+    AUDIO_CODEC_CONFIG,
+    CONNECTION_POOL_CONFIG,
+    FILLER_CONFIG,
+    PHRASE_CACHE_CONFIG,
+    RECONNECT_CONFIG,
+    RECORDING_CONFIG,
+)
+from common.connection_pool import AgentConnectionPool
+from common.conversation_stages import ConversationStages, estimate_tokens
+from common.function_dispatch import FunctionDispatcher
+from common.log_formatter import setup_logging
+from common.metrics import METRICS, TurnTimeline
+from common.mulaw import MulawWebSocket
+from common.pacing import TurnPacer
+from common.phrase_cache import PhraseCache, PhraseCaptureWebSocket
+from common.playback import PlaybackSpeaker
+from common.reconnect import ReconnectingWebSocket
+from common.session_recording import RecordingWebSocket
+from common.tracing import CallTracer, TracedWebSocket
+from common.ui_publisher import LOBBY, UIPublisher, current_room
+from common.vad import VoiceActivityDetector
 
 
 # Configure Flask and SocketIO
 app = Flask(__name__, static_folder="./static", static_url_path="/")
 socketio = SocketIO(app)
 
+# Conversation and log events reach browsers in per-session, acknowledged frames
+ui = UIPublisher(socketio)
+atexit.register(ui.stop)
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Create console handler with the custom formatter
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(CustomFormatter(socketio=socketio))
-logger.addHandler(console_handler)
+# Colour formatting, console output and browser publishing run on a listener thread
+log_listener = setup_logging(logger, publisher=ui)
+atexit.register(log_listener.stop)
 
 # Remove any existing handlers from the root logger to avoid duplicate messages
 logging.getLogger().handlers = []
 
-VOICE_AGENT_URL = "wss://agent.deepgram.com/agent"
+# Point at mock_agent_server.py (e.g. ws://localhost:8765) to run without the live API
+VOICE_AGENT_URL = os.environ.get("VOICE_AGENT_URL", "wss://agent.deepgram.com/agent")
 
 # Template for the prompt that will be formatted with current date
 PROMPT_TEMPLATE = """You are Michelle, a friendly and professional customer service representative for PacificLight, a leading energy provider in Singapore. Your role is to assist customers with their electricity contracts, billing inquiries, appointments, and general service requests.
@@ -69,6 +99,7 @@ When receiving function results, format responses naturally as a customer servic
 1. For customer lookups:
    - Good: "I've found your account. How can I help you today?"
    - If not found: "I'm having trouble finding that account. Could you try a different phone number or email?"
+   - If the account has a "bill_anomaly", gently mention that their latest bill or recent usage looks higher than usual and offer to look into it
 
 2. For contract information:
    - Instead of listing contracts, summarize them conversationally:
@@ -83,11 +114,15 @@ When receiving function results, format responses naturally as a customer servic
    - Be prepared to explain bill components like energy charges, transmission costs, and taxes
    - Explain any special charges or discounts on their account
    - Offer suggestions for energy savings if they have concerns about high bills
+   - For "why is my bill high?" or plan recommendations, use get_usage_insights rather than reasoning over raw usage data
 
 5. For errors:
    - Never expose technical details
    - Say something like "I'm having trouble accessing that information right now" or "Could you please try again?"
 
+6. For results marked "stale": true:
+   - Share them, but mention the information may be slightly out of date, without giving technical details
+
 EXAMPLES OF GOOD RESPONSES:
 ✓ "Let me look that up for you... I can see you're currently on our Fixed Price Plan."
 ✓ "Your customer ID is zero two two two."
@@ -106,7 +141,11 @@ ENERGY-SPECIFIC KNOWLEDGE:
 - Adhere to regulatory standards and company policies
 - Know basic energy-saving tips to suggest to customers
 
-FILLER PHRASES:
+"""
+
+# Filler instructions for each FILLER_CONFIG mode, appended to the prompt
+FILLER_PROMPTS = {
+    "llm": """FILLER PHRASES:
 IMPORTANT: Never generate filler phrases (like "Let me check that", "One moment", etc.) directly in your responses.
 Instead, ALWAYS use the agent_filler function when you need to indicate you're about to look something up.
 
@@ -122,7 +161,14 @@ Correct pattern to follow:
 2. Only speak again after you have the actual information to share
 
 Remember: ANY phrase indicating you're about to look something up MUST be done through the agent_filler function, never through direct response text.
-"""
+""",
+    "auto": """FILLER PHRASES:
+IMPORTANT: Never generate filler phrases (like "Let me check that", "One moment", etc.) and never announce that you are about to look something up.
+Call the lookup function (find_customer, get_contracts, etc.) straight away. If the lookup takes a moment, a filler phrase is played for you automatically.
+Only speak again after you have the actual information to share.
+""",
+}
+PROMPT_TEMPLATE += FILLER_PROMPTS[FILLER_CONFIG["mode"]]
 VOICE = "aura-asteria-en"
 
 USER_AUDIO_SAMPLE_RATE = 48000
@@ -132,15 +178,18 @@ USER_AUDIO_SAMPLES_PER_CHUNK = round(USER_AUDIO_SAMPLE_RATE * USER_AUDIO_SECS_PE
 AGENT_AUDIO_SAMPLE_RATE = 16000
 AGENT_AUDIO_BYTES_PER_SEC = 2 * AGENT_AUDIO_SAMPLE_RATE
 
+# Encoding on the wire; audio is always 16-bit PCM inside the client
+AUDIO_ENCODING = AUDIO_CODEC_CONFIG["encoding"]
+
 SETTINGS = {
     "type": "SettingsConfiguration",
     "audio": {
         "input": {
-            "encoding": "linear16",
+            "encoding": AUDIO_ENCODING,
             "sample_rate": USER_AUDIO_SAMPLE_RATE,
         },
         "output": {
-            "encoding": "linear16",
+            "encoding": AUDIO_ENCODING,
             "sample_rate": AGENT_AUDIO_SAMPLE_RATE,
             "container": "none",
         },
@@ -167,45 +216,129 @@ SETTINGS = {
 }
 
 
+def agent_settings(functions, context=None):
+    """
+    The settings message with today's date in the prompt and the given
+    tools. context replaces the greeting when resuming a conversation.
+    """
+    # Format the prompt with the current date
+    current_date = datetime.now().strftime("%A, %B %d, %Y")
+    formatted_prompt = PROMPT_TEMPLATE.format(current_date=current_date)
+
+    # Copy the nested settings so concurrent calls never share a tool list
+    think = {**SETTINGS["agent"]["think"], "instructions": formatted_prompt, "functions": functions}
+    settings = {**SETTINGS, "agent": {**SETTINGS["agent"], "think": think}}
+    if context is not None:
+        settings["context"] = context
+    return settings
+
+
+# Agent audio for injected fillers and farewells, shared by every call with this voice
+phrase_cache = PhraseCache(VOICE, AGENT_AUDIO_SAMPLE_RATE)
+
+
+async def open_agent_connection(url=VOICE_AGENT_URL, context=None, functions=None):
+    """Connect to the agent API and send the settings, offering the first stage's tools by default."""
+    if functions is None:
+        functions = ConversationStages().functions()
+    settings = agent_settings(functions, context)
+
+    ws = await websockets.connect(
+        url,
+        extra_headers={"Authorization": f"Token {os.environ['DEEPGRAM_API_KEY']}"},
+        # A pre-connected socket buffers the greeting until a call takes it
+        max_queue=None,
+    )
+    # For the session recording, which only wraps the socket once a call takes it
+    ws.connected_at = time.monotonic()
+    ws.settings_message = json.dumps(settings)
+    await ws.send(ws.settings_message)
+    return ws
+
+
 class VoiceAgent:
     def __init__(self):
         self.mic_audio_queue = asyncio.Queue()
         self.speaker = None
+        self.dispatcher = None
         self.ws = None
         self.is_running = False
         self.loop = None
         self.stream = None
         self.input_device_id = None
         self.output_device_id = None
+        # Headless audio channel (see common.audio_io); None uses the local sound devices
+        self.audio = None
+        self.vad = VoiceActivityDetector(USER_AUDIO_SAMPLE_RATE, USER_AUDIO_SECS_PER_CHUNK)
+        self.pacer = TurnPacer()
+        self.timeline = TurnTimeline()
+        self.tracer = CallTracer()
+        self.stages = ConversationStages()
+        self.filler = AutoFiller(self.play_cached, logger)
+        self.context_tokens = None
+        self.session_id = None
+        # How the call ended: "end_call", "close_connection" or "closed" (a normal
+        # close); None while it runs or when it failed
+        self.ended = None
+        self.url = VOICE_AGENT_URL
+        # Pre-connected websockets to take the connection from, if any
+        self.pool = None
+        self.task = None
+        # UI room this call's conversation and logs are published to
+        self.room = f"call-{os.urandom(6).hex()}"
 
     def set_loop(self, loop):
         self.loop = loop
 
     async def setup(self):
-        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if dg_api_key is None:
+        if os.environ.get("DEEPGRAM_API_KEY") is None:
             logger.error("DEEPGRAM_API_KEY env var not present")
             return False
 
-        # Format the prompt with the current date
-        current_date = datetime.now().strftime("%A, %B %d, %Y")
-        formatted_prompt = PROMPT_TEMPLATE.format(current_date=current_date)
-
-        # Update the settings with the formatted prompt
-        settings = SETTINGS.copy()
-        settings["agent"]["think"]["instructions"] = formatted_prompt
-
+        connect_span = self.tracer.start_span("websocket.connect", url=self.url)
         try:
-            self.ws = await websockets.connect(
-                VOICE_AGENT_URL,
-                extra_headers={"Authorization": f"Token {dg_api_key}"},
-            )
-            await self.ws.send(json.dumps(settings))
+            if self.pool is not None:
+                ws, pooled = await self.pool.acquire()
+            else:
+                ws, pooled = await open_agent_connection(self.url), False
+            logger.info(f"Agent connection ready ({'pre-connected' if pooled else 'new'})")
+            self.ws = self.wrap_connection(ws)
+            if RECONNECT_CONFIG["enabled"]:
+                self.ws = ReconnectingWebSocket(self.ws, self.reconnect, logger, 2 * USER_AUDIO_SAMPLE_RATE)
+            self.tracer.end_span(connect_span, pooled=pooled)
+            self.log_stage(agent_settings(self.stages.functions()))
             return True
         except Exception as e:
+            self.tracer.end_span(connect_span, error=str(e))
             logger.error(f"Failed to connect to Deepgram: {e}")
             return False
 
+    def wrap_connection(self, ws):
+        if RECORDING_CONFIG["enabled"]:
+            ws = RecordingWebSocket(ws, connected_at=ws.connected_at, sent=[ws.settings_message])
+            logger.info(f"Recording session to {ws.path}")
+        if self.tracer.sampled:
+            ws = TracedWebSocket(ws, self.tracer)
+        if AUDIO_ENCODING == "mulaw":
+            ws = MulawWebSocket(ws)
+        if PHRASE_CACHE_CONFIG["enabled"]:
+            ws = PhraseCaptureWebSocket(ws, phrase_cache, logger)
+        return ws
+
+    async def reconnect(self, context):
+        """Open a new connection that resumes the conversation; called by ReconnectingWebSocket."""
+        span = self.tracer.start_span("websocket.reconnect", url=self.url)
+        try:
+            ws = await open_agent_connection(self.url, context, self.stages.functions())
+        except Exception as e:
+            self.tracer.end_span(span, error=str(e))
+            raise
+        self.tracer.end_span(span, messages=len(context["messages"]) if context else 0)
+        if context and context["replay"] and self.speaker:
+            # The agent says the interrupted reply again from the start
+            self.speaker.stop()
+        return self.wrap_connection(ws)
+
     def audio_callback(self, indata, frames, time, status):
         """This is called (from a separate thread) for each audio block."""
         if status:
@@ -222,6 +355,9 @@ class VoiceAgent:
                 logger.error(f"Error in audio callback: {e}")
 
     async def start_microphone(self):
+        if self.audio is not None:
+            await self.audio.start(self.mic_audio_queue, self.hang_up)
+            return None, None
         try:
             # List available input devices
             devices = sd.query_devices()
@@ -260,8 +396,16 @@ class VoiceAgent:
             logger.error(f"Error starting microphone: {e}")
             raise
 
+    async def hang_up(self):
+        """End the call from the caller's side, as when their audio channel closes."""
+        self.is_running = False
+        if self.ws:
+            await close_websocket_with_timeout(self.ws)
+
     def cleanup(self):
         """Clean up audio resources"""
+        if self.audio is not None:
+            self.audio.close()
         if self.stream:
             try:
                 self.stream.stop()
@@ -273,16 +417,174 @@ class VoiceAgent:
         try:
             while self.is_running:
                 data = await self.mic_audio_queue.get()
-                if self.ws and data:
+                if not self.is_running:
+                    # The call ended while waiting for audio
+                    return
+                if not self.ws or not data:
+                    continue
+                if not self.vad.enabled:
                     await self.ws.send(data)
+                    continue
+
+                # Only speech (plus pre-roll and hangover) is streamed; silence
+                # is replaced by an occasional keepalive or comfort frame
+                chunks = self.vad.process(data)
+                for chunk in chunks:
+                    await self.ws.send(chunk)
+                if not chunks:
+                    message = self.vad.silence_message(len(data))
+                    if message is not None:
+                        await self.ws.send(message)
+        except websockets.exceptions.ConnectionClosedOK:
+            # A normal hang-up closed the connection under a pending send
+            return
         except Exception as e:
-            logger.error(f"Error in sender: {e}")
+            if self.is_running:
+                logger.error(f"Error in sender: {e}")
+
+    def log_function_summary(self):
+        if not self.dispatcher:
+            return
+        stats = self.dispatcher.single_flight.stats
+        if stats["executed"]:
+            logger.info(
+                f"Function calls: {stats['executed']} executed, {stats['merged']} merged, "
+                f"{stats['idempotent_replays']} idempotent replays, "
+                f"{self.dispatcher.stats['overlapped']} run alongside another call"
+            )
+
+    def log_filler_summary(self):
+        if not self.filler.enabled:
+            return
+        turns, spoken = self.filler.summary()
+        METRICS.inc("voice_agent_auto_filler_total", spoken, result="spoken")
+        METRICS.inc("voice_agent_auto_filler_total", turns - spoken, result="skipped")
+        if turns:
+            logger.info(
+                f"Auto filler: {turns} agent_filler round trips saved, "
+                f"filler said in {spoken} of {turns} function-call turns"
+            )
+
+    def log_reconnect_summary(self):
+        if not isinstance(self.ws, ReconnectingWebSocket) or not self.ws.stats["drops"]:
+            return
+        stats = self.ws.stats
+        METRICS.inc("voice_agent_reconnects_total", stats["reconnects"])
+        logger.info(
+            f"Reconnects: {stats['reconnects']}/{stats['drops']} drops resumed, "
+            f"{stats['audio_bytes_buffered']} bytes of audio buffered, {stats['audio_bytes_dropped']} dropped"
+        )
+
+    def log_stage(self, settings):
+        instructions = settings["agent"]["think"]["instructions"]
+        self.context_tokens = self.stages.context_tokens(instructions)
+        all_tools = estimate_tokens(instructions + json.dumps(FUNCTION_DEFINITIONS))
+        logger.info(
+            f"Conversation stage {self.stages.stage}: {len(settings['agent']['think']['functions'])} tools, "
+            f"~{self.context_tokens} context tokens (~{all_tools} with every tool)"
+        )
+
+    async def update_stage(self):
+        """Send settings offering the tools unlocked by the new stage."""
+        settings = agent_settings(self.stages.functions())
+        # The conversation context only applies when a session starts
+        del settings["context"]
+        await self.ws.send(json.dumps(settings))
+        self.log_stage(settings)
+
+    async def play_cached(self, inject_message):
+        """Play a fixed phrase from the phrase cache; returns False when its audio is not known."""
+        audio = phrase_cache.get(inject_message["message"])
+        if audio is not None and self.speaker:
+            logger.info(f"Playing cached agent audio for: {inject_message['message']}")
+            METRICS.inc("voice_agent_phrase_cache_total", result="hit")
+            await self.speaker.play(audio)
+            self.speaker.audio_done()
+            return True
+        if phrase_cache.enabled:
+            METRICS.inc("voice_agent_phrase_cache_total", result="miss")
+        return False
+
+    async def inject(self, inject_message):
+        """
+        Have the agent say a fixed phrase: played from the phrase cache when
+        its audio is known (returns True), otherwise sent as InjectAgentMessage.
+        """
+        if await self.play_cached(inject_message):
+            return True
+        await inject_agent_message(self.ws, inject_message)
+        return False
+
+    async def before_function_response(self, function_name, result):
+        # Unlock tools before the response, so the agent's next decision can use them
+        if self.stages.observe_result(function_name, result):
+            await self.update_stage()
+
+    def observe_decision_latency(self, latency):
+        METRICS.observe(
+            "voice_agent_llm_decision_seconds", latency, staging="on" if self.stages.enabled else "off"
+        )
+
+    def log_pacing_summary(self):
+        waited, fixed, count = self.pacer.summary()
+        if count:
+            logger.info(
+                f"Pacing ({self.pacer.config['mode']}): waited {waited:.2f}s over {count} pauses "
+                f"vs {fixed:.2f}s with fixed sleeps (saved {fixed - waited:.2f}s)"
+            )
+
+    def finish_turn(self):
+        marks, stages = self.timeline.finish()
+        self.tracer.record_turn(marks, stages)
+        return stages
+
+    async def sample_queue_depth(self):
+        """Record the speaker queue depth on the session trace at a fixed interval."""
+        interval = self.tracer.config["queue_depth_interval_secs"]
+        while self.is_running:
+            if self.speaker:
+                self.tracer.add_event(
+                    "speaker.queue_depth", queued_secs=round(self.speaker.remaining_playback_secs(), 3)
+                )
+            await asyncio.sleep(interval)
+
+    def record_session_metrics(self):
+        """Fold this call's final turn and audio counters into the process-wide metrics."""
+        self.finish_turn()
+        METRICS.inc("voice_agent_sessions_total")
+        stats = self.vad.stats
+        METRICS.inc("voice_agent_mic_bytes_total", stats["bytes_total"])
+        METRICS.inc("voice_agent_mic_bytes_sent_total", stats["bytes_sent"])
+        METRICS.inc("voice_agent_vad_missed_onsets_total", stats["missed_onsets"])
+
+    def log_vad_summary(self):
+        if not self.vad.enabled or not self.vad.stats["chunks_total"]:
+            return
+        stats = self.vad.stats
+        logger.info(
+            f"VAD: {stats['chunks_suppressed']}/{stats['chunks_total']} chunks suppressed, "
+            f"bandwidth saved {self.vad.bandwidth_saved():.1%}, "
+            f"onsets {stats['onsets']}, missed onsets {stats['missed_onsets']}"
+        )
+
+    def create_speaker(self):
+        if self.audio is not None:
+            return self.audio.create_speaker()
+        return Speaker()
 
     async def receiver(self):
         try:
-            self.speaker = Speaker()
+            self.speaker = self.create_speaker()
+            self.dispatcher = FunctionDispatcher(
+                self.ws,
+                logger,
+                timeline=self.timeline,
+                tracer=self.tracer if self.tracer.sampled else None,
+                before_response=self.before_function_response,
+                inject=self.inject,
+                filler=self.filler,
+            )
             last_user_message = None
-            last_function_response_time = None
             in_function_chain = False
 
             with self.speaker:
@@ -295,32 +597,54 @@ class VoiceAgent:
 
                         if message_type == "UserStartedSpeaking":
                             self.speaker.stop()
+                            self.vad.note_server_speech_start()
+                            self.filler.new_turn()
+                            self.finish_turn()
+                        elif message_type == "EndOfThought":
+                            self.timeline.mark("user_stopped_speaking")
                         elif message_type == "ConversationText":
                             if message_json.get("role") == "assistant":
-                                # Add a natural pause before assistant speaks
-                                await asyncio.sleep(1.5)
+                                # Optional natural pause before assistant speaks
+                                await self.pacer.pause("assistant_text")
                             
-                            # Emit the conversation text to the client
-                            socketio.emit("conversation_update", message_json)
+                            # Publish the conversation text to the browsers watching this call
+                            ui.publish(
+                                self.room,
+                                "conversation",
+                                {**message_json, "timestamp": datetime.now().isoformat()},
+                            )
 
                             if message_json.get("role") == "user":
+                                if self.stages.observe_user_text(message_json.get("content", "")):
+                                    await self.update_stage()
+                                METRICS.observe(
+                                    "voice_agent_context_tokens",
+                                    self.context_tokens,
+                                    staging="on" if self.stages.enabled else "off",
+                                )
+                                self.timeline.mark("user_stopped_speaking")
                                 last_user_message = current_time
                                 in_function_chain = False
                             elif message_json.get("role") == "assistant":
                                 in_function_chain = False
 
                         elif message_type == "FunctionCalling":
+                            self.timeline.mark("function_calling")
+                            last_function_response_time = self.dispatcher.last_response_time
                             if in_function_chain and last_function_response_time:
                                 latency = current_time - last_function_response_time
                                 logger.info(f"LLM Decision Latency (chain): {latency:.3f}s")
+                                self.observe_decision_latency(latency)
                             elif last_user_message:
                                 latency = current_time - last_user_message
                                 logger.info(f"LLM Decision Latency (initial): {latency:.3f}s")
+                                self.observe_decision_latency(latency)
                                 in_function_chain = True
 
                         elif message_type == "FunctionCallRequest":
-                            # Add a small delay before processing functions
-                            await asyncio.sleep(0.5)
+                            self.timeline.mark("function_request_received")
+                            # Optional small delay before processing functions
+                            await self.pacer.pause("function_call")
                             
                             function_name = message_json.get("function_name")
                             function_call_id = message_json.get("function_call_id")
@@ -329,108 +653,72 @@ class VoiceAgent:
                             logger.info(f"Function call received: {function_name}")
                             logger.info(f"Parameters: {parameters}")
 
-                            start_time = time.time()
-                            try:
-                                func = FUNCTION_MAP.get(function_name)
-                                if not func:
-                                    raise ValueError(f"Function {function_name} not found")
-
-                                # Special handling for functions that need websocket
-                                if function_name in ["agent_filler", "end_call"]:
-                                    result = await func(self.ws, parameters)
-
-                                    if function_name == "agent_filler":
-                                        # Extract messages
-                                        inject_message = result["inject_message"]
-                                        function_response = result["function_response"]
-
-                                        # First send the function response
-                                        response = {
-                                            "type": "FunctionCallResponse",
-                                            "function_call_id": function_call_id,
-                                            "output": json.dumps(function_response),
-                                        }
-                                        await self.ws.send(json.dumps(response))
-                                        logger.info(f"Function response sent: {json.dumps(function_response)}")
-
-                                        # Update the last function response time
-                                        last_function_response_time = time.time()
-                                        # Then just inject the message and continue
-                                        await inject_agent_message(self.ws, inject_message)
-                                        continue
-
-                                    elif function_name == "end_call":
-                                        # Extract messages
-                                        inject_message = result["inject_message"]
-                                        function_response = result["function_response"]
-                                        close_message = result["close_message"]
-
-                                        # First send the function response
-                                        response = {
-                                            "type": "FunctionCallResponse",
-                                            "function_call_id": function_call_id,
-                                            "output": json.dumps(function_response),
-                                        }
-                                        await self.ws.send(json.dumps(response))
-                                        logger.info(f"Function response sent: {json.dumps(function_response)}")
-
-                                        # Update the last function response time
-                                        last_function_response_time = time.time()
-
-                                        # Then wait for farewell sequence to complete
-                                        await wait_for_farewell_completion(self.ws, self.speaker, inject_message)
-
-                                        # Finally send the close message and exit
-                                        logger.info(f"Sending ws close message")
-                                        await close_websocket_with_timeout(self.ws)
-                                        self.is_running = False
-                                        break
-                                else:
-                                    result = await func(parameters)
-
-                                execution_time = time.time() - start_time
-                                logger.info(f"Function Execution Latency: {execution_time:.3f}s")
-
-                                # Send the response back
-                                response = {
-                                    "type": "FunctionCallResponse",
-                                    "function_call_id": function_call_id,
-                                    "output": json.dumps(result),
-                                }
-                                await self.ws.send(json.dumps(response))
-                                logger.info(f"Function response sent: {json.dumps(result)}")
-
-                                # Update the last function response time
-                                last_function_response_time = time.time()
-
-                            except Exception as e:
-                                logger.error(f"Error executing function: {str(e)}")
-                                result = {"error": str(e)}
-                                response = {
-                                    "type": "FunctionCallResponse",
-                                    "function_call_id": function_call_id,
-                                    "output": json.dumps(result),
-                                }
-                                await self.ws.send(json.dumps(response))
+                            if function_name != "end_call":
+                                # Run as a task so audio and barge-in keep flowing during the lookup
+                                self.dispatcher.submit(function_call_id, function_name, parameters)
+                                continue
+
+                            # end_call reads the websocket itself during the farewell, so it
+                            # runs inline once every earlier call has been answered
+                            await self.dispatcher.drain()
+                            result = await self.dispatcher.execute(function_name, parameters)
+                            if "error" in result:
+                                await self.dispatcher.send_response(function_call_id, result)
+                                continue
+
+                            # First send the function response
+                            await self.dispatcher.send_response(function_call_id, result["function_response"])
+
+                            # Then wait for farewell sequence to complete
+                            await wait_for_farewell_completion(
+                                self.ws, self.speaker, result["inject_message"], self.pacer, self.inject
+                            )
+
+                            # Finally send the close message and exit
+                            logger.info(f"Sending ws close message")
+                            await close_websocket_with_timeout(self.ws)
+                            self.is_running = False
+                            self.ended = "end_call"
+                            break
 
+                        elif message_type == "AgentAudioDone":
+                            self.timeline.mark("agent_audio_done")
+                            self.speaker.audio_done()
                         elif message_type == "Welcome":
-                            logger.info(f"Connected with session ID: {message_json.get('session_id')}")
+                            self.session_id = message_json.get("session_id")
+                            logger.info(f"Connected with session ID: {self.session_id}")
                         elif message_type == "CloseConnection":
                             logger.info("Closing connection...")
                             await self.ws.close()
+                            self.ended = "close_connection"
                             break
 
                     elif isinstance(message, bytes):
+                        if not self.timeline.has("first_agent_audio"):
+                            self.timeline.mark("first_agent_audio")
                         await self.speaker.play(message)
+                else:
+                    self.ended = "closed"
 
         except Exception as e:
             logger.error(f"Error in receiver: {e}")
+        finally:
+            # The call is over once the agent stops talking to us; wake the sender so it exits
+            self.is_running = False
+            self.mic_audio_queue.put_nowait(b"")
+            if self.dispatcher:
+                self.dispatcher.cancel()
 
     async def run(self):
         if not await self.setup():
+            self.tracer.close()
+            self.cleanup()
             return
 
         self.is_running = True
+        sampler = None
+        if self.tracer.sampled:
+            sampler = asyncio.create_task(self.sample_queue_depth())
         try:
             stream, _ = await self.start_microphone()
             await asyncio.gather(
@@ -441,17 +729,25 @@ class VoiceAgent:
             logger.error(f"Error in run: {e}")
         finally:
             self.is_running = False
+            if sampler:
+                sampler.cancel()
             self.cleanup()
+            self.log_vad_summary()
+            self.log_pacing_summary()
+            self.log_function_summary()
+            self.log_filler_summary()
+            self.log_reconnect_summary()
+            self.record_session_metrics()
+            self.tracer.close(**{"session.id": self.session_id})
+            ui.close_room(self.room)
             if self.ws:
                 await self.ws.close()
 
 
-class Speaker:
+class Speaker(PlaybackSpeaker):
     def __init__(self):
-        self._queue = None
+        super().__init__(AGENT_AUDIO_SAMPLE_RATE, logger)
         self._stream = None
-        self._thread = None
-        self._stop = None
 
     def __enter__(self):
         # Select output device
@@ -466,52 +762,32 @@ class Speaker:
         # If no device was selected or found, use default
         if output_device is None:
             output_device = sd.default.device[1]
-            
-        self._stream = sd.RawOutputStream(
+
+        self.open_engine()
+        self._stream = sd.OutputStream(
             samplerate=AGENT_AUDIO_SAMPLE_RATE,
-            blocksize=AGENT_AUDIO_SAMPLE_RATE // 10,  # 100ms blocks
+            blocksize=self._engine.block_samples,  # Fixed blocks so a flush takes effect within one block
             device=output_device,
             channels=1,
-            dtype='int16'
+            dtype='int16',
+            latency="low",
+            callback=self._callback,
         )
         self._stream.start()
-        self._queue = janus.Queue()
-        self._stop = threading.Event()
-        self._thread = threading.Thread(
-            target=_play, args=(self._queue, self._stream, self._stop), daemon=True
-        )
-        self._thread.start()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._stop.set()
-        self._thread.join()
         self._stream.stop()
         self._stream.close()
         self._stream = None
-        self._queue = None
-        self._thread = None
-        self._stop = None
-
-    async def play(self, data):
-        return await self._queue.async_q.put(data)
-
-    def stop(self):
-        if self._queue and self._queue.async_q:
-            while not self._queue.async_q.empty():
-                try:
-                    self._queue.async_q.get_nowait()
-                except janus.QueueEmpty:
-                    break
+        self.close_engine()
 
+    def _callback(self, outdata, frames, time, status):
+        """Called from the PortAudio thread for every output block."""
+        self._engine.fill_block(outdata[:, 0])
 
-def _play(audio_out, stream, stop):
-    while not stop.is_set():
-        try:
-            data = audio_out.sync_q.get(True, 0.05)
-            stream.write(data)
-        except queue.Empty:
-            pass
+    def output_latency_secs(self):
+        return self._stream.latency
 
 
 async def inject_agent_message(ws, inject_message):
@@ -528,13 +804,17 @@ async def close_websocket_with_timeout(ws, timeout=5):
         logger.error(f"Error during websocket closure: {e}")
 
 
-async def wait_for_farewell_completion(ws, speaker, inject_message):
+async def wait_for_farewell_completion(ws, speaker, inject_message, pacer, inject=None):
     """Wait for the farewell message to be spoken completely by the agent."""
-    # Send the farewell message
-    await inject_agent_message(ws, inject_message)
+    # Send the farewell message, or play it from the phrase cache
+    if inject:
+        played_locally = await inject(inject_message)
+    else:
+        await inject_agent_message(ws, inject_message)
+        played_locally = False
 
     # First wait for either AgentStartedSpeaking or matching ConversationText
-    speaking_started = False
+    speaking_started = played_locally
     while not speaking_started:
         message = await ws.recv()
         if isinstance(message, bytes):
@@ -554,7 +834,7 @@ async def wait_for_farewell_completion(ws, speaker, inject_message):
             continue
 
     # Then wait for AgentAudioDone
-    audio_done = False
+    audio_done = played_locally
     while not audio_done:
         message = await ws.recv()
         if isinstance(message, bytes):
@@ -565,12 +845,14 @@ async def wait_for_farewell_completion(ws, speaker, inject_message):
             message_json = json.loads(message)
             logger.info(f"Server: {message}")
             if message_json.get("type") == "AgentAudioDone":
+                speaker.audio_done()
                 audio_done = True
         except json.JSONDecodeError:
             continue
 
-    # Give audio time to play completely
-    await asyncio.sleep(3.5)
+    # Give the queued audio time to play completely
+    waited = await pacer.pause("farewell", speaker.remaining_playback_secs())
+    logger.info(f"Farewell playback wait: {waited:.2f}s")
 
 
 # Flask routes
@@ -581,44 +863,61 @@ def index():
     return render_template("index.html", sample_data=sample_data)
 
 
+@app.route("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return Response(METRICS.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 voice_agent = None
 
+# Every call, and the pool of pre-connected agent websockets, runs on one shared
+# event loop, so a socket opened ahead of time can be handed to any call
+agent_loop = None
+connection_pool = None
+_agent_loop_lock = threading.Lock()
+# Open pages; the pool only keeps connections ready while there are any
+connected_sids = set()
 
-def run_async_voice_agent():
-    try:
-        # Create a new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
 
-        # Set the loop in the voice agent
-        voice_agent.set_loop(loop)
+def get_agent_loop():
+    """Start the shared call loop, and the connection pool, on first use."""
+    global agent_loop
+    with _agent_loop_lock:
+        if agent_loop is None:
+            agent_loop = asyncio.new_event_loop()
+            socketio.start_background_task(target=agent_loop.run_forever)
+            if CONNECTION_POOL_CONFIG["enabled"] and os.environ.get("DEEPGRAM_API_KEY"):
+                asyncio.run_coroutine_threadsafe(start_connection_pool(), agent_loop)
+        return agent_loop
 
-        try:
-            # Run the voice agent
-            loop.run_until_complete(voice_agent.run())
-        except asyncio.CancelledError:
-            logger.info("Voice agent task was cancelled")
-        except Exception as e:
-            logger.error(f"Error in voice agent thread: {e}")
-        finally:
-            # Clean up the loop
-            try:
-                # Cancel all running tasks
-                pending = asyncio.all_tasks(loop)
-                for task in pending:
-                    task.cancel()
-
-                # Allow cancelled tasks to complete
-                if pending:
-                    loop.run_until_complete(
-                        asyncio.gather(*pending, return_exceptions=True)
-                    )
-
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            finally:
-                loop.close()
+
+async def start_connection_pool():
+    global connection_pool
+    connection_pool = AgentConnectionPool(open_agent_connection, logger)
+    await connection_pool.start()
+
+
+def notify_connection_pool(in_demand):
+    """Warm the pool (a page opened) or let it stand down (the last page closed)."""
+    if connection_pool is not None:
+        agent_loop.call_soon_threadsafe(connection_pool.touch if in_demand else connection_pool.stand_down)
+
+
+async def run_voice_agent(agent):
+    # Logs from this call's tasks go to the call's room
+    current_room.set(agent.room)
+    agent.pool = connection_pool
+    try:
+        await agent.run()
+    except asyncio.CancelledError:
+        logger.info("Voice agent task was cancelled")
     except Exception as e:
-        logger.error(f"Error in voice agent thread setup: {e}")
+        logger.error(f"Error in voice agent: {e}")
+    finally:
+        # A caller who just hung up may call again; keep the pool warm from here
+        if agent.pool is not None:
+            agent.pool.touch()
 
 
 @socketio.on("start_voice_agent")
@@ -629,8 +928,49 @@ def handle_start_voice_agent(data=None):
         if data:
             voice_agent.input_device_id = data.get("inputDeviceId")
             voice_agent.output_device_id = data.get("outputDeviceId")
-        # Start the voice agent in a background thread
-        socketio.start_background_task(target=run_async_voice_agent)
+            if data.get("audio") == "browser":
+                # The page streams the microphone and plays the agent itself
+                voice_agent.audio = BrowserAudioTransport(
+                    socketio, request.sid, 2 * USER_AUDIO_SAMPLES_PER_CHUNK, AGENT_AUDIO_SAMPLE_RATE, logger
+                )
+        ui.join(request.sid, voice_agent.room)
+        # Let other open pages follow the call
+        ui.publish(LOBBY, "session", {"room": voice_agent.room})
+        # Run the call on the shared loop, where the pre-connected sockets live
+        loop = get_agent_loop()
+        voice_agent.set_loop(loop)
+        voice_agent.task = asyncio.run_coroutine_threadsafe(run_voice_agent(voice_agent), loop)
+
+
+@socketio.on("connect")
+def handle_connect():
+    ui.connect(request.sid)
+    connected_sids.add(request.sid)
+    # Warm up the connection pool while the page is open, before the first call
+    get_agent_loop()
+    notify_connection_pool(True)
+
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    ui.disconnect(request.sid)
+    connected_sids.discard(request.sid)
+    if not connected_sids:
+        notify_connection_pool(False)
+    # A call whose audio comes from this page cannot go on without it
+    if voice_agent and isinstance(voice_agent.audio, BrowserAudioTransport) and voice_agent.audio.sid == request.sid:
+        handle_stop_voice_agent()
+
+
+@socketio.on("audio_in")
+def handle_audio_in(data):
+    if voice_agent and isinstance(voice_agent.audio, BrowserAudioTransport) and voice_agent.audio.sid == request.sid:
+        voice_agent.audio.feed(data)
+
+
+@socketio.on("watch_session")
+def handle_watch_session(data):
+    ui.join(request.sid, data["room"])
 
 
 @socketio.on("stop_voice_agent")
@@ -638,13 +978,9 @@ def handle_stop_voice_agent():
     global voice_agent
     if voice_agent:
         voice_agent.is_running = False
-        if voice_agent.loop and not voice_agent.loop.is_closed():
-            try:
-                # Cancel all running tasks
-                for task in asyncio.all_tasks(voice_agent.loop):
-                    task.cancel()
-            except Exception as e:
-                logger.error(f"Error stopping voice agent: {e}")
+        # Cancel only this call; the shared loop keeps the connection pool running
+        if voice_agent.task:
+            voice_agent.task.cancel()
         voice_agent = None
 
 
@@ -7,6 +7,7 @@ from common.business_logic import (
     get_customer_contracts,
     get_customer_billing,
     get_customer_usage,
+    get_customer_usage_insights,
     get_customer_payment_methods,
     schedule_appointment,
     get_available_appointment_slots,
@@ -69,6 +70,16 @@ async def get_usage_data(params):
     return result
 
 
+async def get_usage_insights(params):
+    """Get usage statistics and plan savings for a customer."""
+    customer_id = params.get("customer_id")
+    if not customer_id:
+        return {"error": "customer_id is required"}
+
+    result = await get_customer_usage_insights(customer_id)
+    return result
+
+
 async def get_payment_methods(params):
     """Get payment methods for a customer."""
     customer_id = params.get("customer_id")
@@ -95,13 +106,11 @@ async def create_appointment(params):
 async def check_availability(params):
     """Check available appointment slots."""
     start_date = params.get("start_date")
-    end_date = params.get(
-        "end_date", (datetime.fromisoformat(start_date) + timedelta(days=7)).isoformat()
-    )
-
     if not start_date:
         return {"error": "start_date is required"}
 
+    end_date = params.get("end_date") or (datetime.fromisoformat(start_date) + timedelta(days=7)).isoformat()
+
     result = await get_available_appointment_slots(start_date, end_date)
     return result
 
@@ -123,17 +132,17 @@ async def end_call(websocket, params):
     return result
 
 
-async def handle_customer_complaint(params):
+def handle_customer_complaint(params):
     """Handle a customer complaint and record it in the system."""
     customer_id = params.get("customer_id")
     complaint_details = params.get("complaint_details")
     
-    result = await handle_complaint(customer_id, complaint_details)
+    result = handle_complaint(customer_id, complaint_details)
     
     return result
 
 
-async def request_service_connection(params):
+def request_service_connection(params):
     """Handle a request for a new service connection or modification."""
     customer_name = params.get("customer_name")
     phone = params.get("phone")
@@ -142,7 +151,7 @@ async def request_service_connection(params):
     service_type = params.get("service_type")
     details = params.get("details")
     
-    result = await request_new_service(
+    result = request_new_service(
         customer_name, phone, email, address, service_type, details
     )
     
@@ -292,6 +301,29 @@ FUNCTION_DEFINITIONS = [
             "required": ["customer_id"],
         },
     },
+    {
+        "name": "get_usage_insights",
+        "description": """Retrieve a compact summary of a customer's usage and bills. Use this function when:
+        - A customer asks why their bill is high or has gone up
+        - A customer asks whether another plan would save them money
+        - A customer asks how their usage is trending
+        
+        Returns 7 and 30 day average daily usage, the peak to off-peak ratio, month-over-month bill and usage change,
+        anomaly flags, and the projected monthly saving of each plan type (positive means cheaper than today).
+        Prefer this over get_usage_data unless the customer asks about specific days.
+        
+        Always verify you have the customer's account first using find_customer before checking usage insights.""",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "string",
+                    "description": "Customer's ID in CUSTXXXX format. Must be obtained from find_customer first.",
+                }
+            },
+            "required": ["customer_id"],
+        },
+    },
     {
         "name": "get_payment_methods",
         "description": """Retrieve payment methods for a customer. Use this function when:
@@ -331,6 +363,7 @@ FUNCTION_DEFINITIONS = [
                 "date": {
                     "type": "string",
                     "description": "Appointment date and time in ISO format (YYYY-MM-DDTHH:MM:SS). Must be a time slot confirmed as available.",
+                    "format": "date-time",
                 },
                 "service": {
                     "type": "string",
@@ -356,10 +389,12 @@ FUNCTION_DEFINITIONS = [
                 "start_date": {
                     "type": "string",
                     "description": "Start date in ISO format (YYYY-MM-DDTHH:MM:SS). Usually today's date for immediate availability checks.",
+                    "format": "date-time",
                 },
                 "end_date": {
                     "type": "string",
                     "description": "End date in ISO format. Optional - defaults to 7 days after start_date. Use for specific date range requests.",
+                    "format": "date-time",
                 },
             },
             "required": ["start_date"],
@@ -456,6 +491,25 @@ FUNCTION_DEFINITIONS = [
     },
 ]
 
+# Functions whose implementations take the agent websocket as their first argument
+WEBSOCKET_FUNCTIONS = {"agent_filler", "end_call"}
+
+# Functions that change stored data; identical calls are protected by idempotency keys
+# instead of being merged
+WRITE_FUNCTIONS = {"create_appointment", "handle_customer_complaint", "request_service_connection"}
+
+# Reads whose last good result may answer a failed call, marked stale (see common.resilience).
+# check_availability is left out: a stale slot may already be booked.
+STALE_SAFE_FUNCTIONS = {
+    "find_customer",
+    "get_appointments",
+    "get_contracts",
+    "get_billing_history",
+    "get_usage_data",
+    "get_usage_insights",
+    "get_payment_methods",
+}
+
 # Map function names to their implementations
 FUNCTION_MAP = {
     "find_customer": find_customer,
@@ -463,6 +517,7 @@ FUNCTION_MAP = {
     "get_contracts": get_contracts,
     "get_billing_history": get_billing_history,
     "get_usage_data": get_usage_data,
+    "get_usage_insights": get_usage_insights,
     "get_payment_methods": get_payment_methods,
     "create_appointment": create_appointment,
     "check_availability": check_availability,
@@ -471,3 +526,34 @@ FUNCTION_MAP = {
     "handle_customer_complaint": handle_customer_complaint,
     "request_service_connection": request_service_connection,
 }
+
+# How each function in FUNCTION_MAP is executed (see common.executors.EXECUTION_MODES).
+# Functions that block on file or database I/O are plain functions run on the
+# thread pool; CPU-heavy ones go to the process pool. Unlisted functions are async.
+FUNCTION_MODES = {
+    "find_customer": "async",
+    "get_appointments": "async",
+    "get_contracts": "async",
+    "get_billing_history": "async",
+    "get_usage_data": "async",
+    "get_usage_insights": "async",
+    "get_payment_methods": "async",
+    "create_appointment": "async",
+    "check_availability": "async",
+    "agent_filler": "async",
+    "end_call": "async",
+    "handle_customer_complaint": "blocking_io",
+    "request_service_connection": "blocking_io",
+}
+
+# Tools offered from the start of a call, before the customer is identified
+# (see common.conversation_stages)
+IDENTIFY_FUNCTIONS = ["agent_filler", "find_customer", "request_service_connection", "end_call"]
+
+# Tools unlocked by topic once the customer has been identified
+FUNCTION_GROUPS = {
+    "account": ["get_contracts", "get_payment_methods", "get_usage_insights"],
+    "billing": ["get_billing_history", "get_usage_data", "get_usage_insights", "get_payment_methods"],
+    "scheduling": ["get_appointments", "check_availability", "create_appointment"],
+    "complaint": ["handle_customer_complaint"],
+}
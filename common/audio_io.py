@@ -0,0 +1,235 @@
+import asyncio
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from common.playback import PlaybackSpeaker
+
+
+def load_wav(path, sample_rate):
+    """Read a 16-bit WAV file as mono PCM at sample_rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16-bit PCM")
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        pcm = pcm.reshape(-1, f.getnchannels())[:, 0]
+        rate = f.getframerate()
+    if rate != sample_rate:
+        positions = np.arange(0, len(pcm), rate / sample_rate)
+        pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.int16)
+    return pcm
+
+
+class PacedSpeaker(PlaybackSpeaker):
+    """
+    Speaker for headless transports. A playback clock on the event loop pulls
+    one PlaybackEngine block per block interval and hands it to write(), so
+    the far end receives agent audio in real time and a barge-in flush takes
+    effect within one block, as with an audio device. Silent blocks are only
+    written when send_silence is set (e.g. for a file that keeps the call's
+    timeline).
+    """
+
+    def __init__(self, write, sample_rate, logger, send_silence=False):
+        super().__init__(sample_rate, logger)
+        self.write = write
+        self.send_silence = send_silence
+        self._task = None
+
+    def __enter__(self):
+        self.open_engine()
+        self._task = asyncio.get_running_loop().create_task(self._clock())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._task.cancel()
+        self.close_engine()
+
+    async def _clock(self):
+        loop = asyncio.get_running_loop()
+        block = np.zeros(self._engine.block_samples, dtype=np.int16)
+        block_secs = len(block) / self.sample_rate
+        next_block = loop.time()
+        try:
+            while True:
+                count = self._engine.fill_block(block)
+                if count or self.send_silence:
+                    await self.write(block.tobytes() if self.send_silence else block[:count].tobytes())
+                next_block += block_secs
+                # After a stall, carry on from now rather than bursting to catch up
+                next_block = max(next_block, loop.time() - block_secs)
+                await asyncio.sleep(max(0.0, next_block - loop.time()))
+        except Exception as e:
+            self.logger.error(f"Error writing agent audio: {e}")
+
+    def output_latency_secs(self):
+        # The block being written
+        return self._engine.block_samples / self.sample_rate
+
+
+class AudioTransport(ABC):
+    """
+    Carries one call's audio when it does not come from a local sound device.
+
+    start() begins feeding microphone PCM (16-bit mono at the microphone
+    rate, in chunk_bytes chunks) to the call's queue and calls hang_up()
+    when the caller's side of the channel ends. create_speaker() returns
+    the speaker agent audio (16-bit mono at the agent rate) is played
+    through, and close() releases the channel.
+    """
+
+    def __init__(self, chunk_bytes, output_sample_rate, logger):
+        self.chunk_bytes = chunk_bytes
+        self.output_sample_rate = output_sample_rate
+        self.logger = logger
+
+    @abstractmethod
+    async def start(self, queue, hang_up):
+        pass
+
+    @abstractmethod
+    def create_speaker(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StreamAudioTransport(AudioTransport):
+    """
+    Raw PCM over a TCP or Unix socket connection: the peer writes microphone
+    audio and reads agent audio on the same connection, and closing it ends
+    the call.
+    """
+
+    def __init__(self, reader, writer, chunk_bytes, output_sample_rate, logger):
+        super().__init__(chunk_bytes, output_sample_rate, logger)
+        self.reader = reader
+        self.writer = writer
+        self._task = None
+
+    async def start(self, queue, hang_up):
+        self._task = asyncio.create_task(self._read(queue, hang_up))
+
+    async def _read(self, queue, hang_up):
+        try:
+            while True:
+                await queue.put(await self.reader.readexactly(self.chunk_bytes))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.logger.info("Caller audio stream closed")
+        await hang_up()
+
+    async def _write(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def create_speaker(self):
+        return PacedSpeaker(self._write, self.output_sample_rate, self.logger)
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+        self.writer.close()
+
+
+class FileAudioTransport(AudioTransport):
+    """
+    Plays a WAV file as the caller, in real time, then tail_secs of silence
+    before hanging up. Agent audio is written to a WAV file on the same
+    timeline, silence included.
+    """
+
+    def __init__(
+        self, input_path, output_path, input_sample_rate, chunk_bytes, output_sample_rate, logger, tail_secs=10.0
+    ):
+        super().__init__(chunk_bytes, output_sample_rate, logger)
+        self.input_path = input_path
+        self.output_path = output_path
+        self.input_sample_rate = input_sample_rate
+        self.tail_secs = tail_secs
+        self._task = None
+        self._output = None
+
+    async def start(self, queue, hang_up):
+        pcm = load_wav(self.input_path, self.input_sample_rate).tobytes()
+        self._task = asyncio.create_task(self._feed(pcm, queue, hang_up))
+
+    async def _feed(self, pcm, queue, hang_up):
+        loop = asyncio.get_running_loop()
+        chunk_secs = self.chunk_bytes / 2 / self.input_sample_rate
+        tail_chunks = int(self.tail_secs / chunk_secs)
+        started = loop.time()
+        chunks = range(0, len(pcm) - self.chunk_bytes + 1, self.chunk_bytes)
+        for i, offset in enumerate(chunks):
+            await queue.put(pcm[offset : offset + self.chunk_bytes])
+            await asyncio.sleep(max(0.0, started + (i + 1) * chunk_secs - loop.time()))
+        silence = bytes(self.chunk_bytes)
+        for i in range(len(chunks), len(chunks) + tail_chunks):
+            await queue.put(silence)
+            await asyncio.sleep(max(0.0, started + (i + 1) * chunk_secs - loop.time()))
+        self.logger.info(f"End of {self.input_path}")
+        await hang_up()
+
+    async def _write(self, data):
+        self._output.writeframes(data)
+
+    def create_speaker(self):
+        self._output = wave.open(self.output_path, "wb")
+        self._output.setnchannels(1)
+        self._output.setsampwidth(2)
+        self._output.setframerate(self.output_sample_rate)
+        return PacedSpeaker(self._write, self.output_sample_rate, self.logger, send_silence=True)
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._output:
+            self._output.close()
+            self._output = None
+
+
+class BrowserAudioTransport(AudioTransport):
+    """
+    Audio streamed by the page over its Socket.IO connection: the page emits
+    "audio_in" microphone PCM, handed to feed() by the event handler, and
+    receives agent audio as "agent_audio" events. Emits go through a single
+    thread, in order, so they never block the event loop.
+    """
+
+    def __init__(self, socketio, sid, chunk_bytes, output_sample_rate, logger):
+        super().__init__(chunk_bytes, output_sample_rate, logger)
+        self.socketio = socketio
+        self.sid = sid
+        self._loop = None
+        self._queue = None
+        self._pending = b""
+        self._emitter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser-audio")
+
+    async def start(self, queue, hang_up):
+        self._queue = queue
+        self._loop = asyncio.get_running_loop()
+
+    def feed(self, data):
+        """Called from the Socket.IO handler thread with microphone PCM from the page."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._receive, data)
+
+    def _receive(self, data):
+        self._pending += data
+        while len(self._pending) >= self.chunk_bytes:
+            self._queue.put_nowait(self._pending[: self.chunk_bytes])
+            self._pending = self._pending[self.chunk_bytes :]
+
+    async def _write(self, data):
+        self._emitter.submit(self.socketio.emit, "agent_audio", data, to=self.sid)
+
+    def create_speaker(self):
+        return PacedSpeaker(self._write, self.output_sample_rate, self.logger)
+
+    def close(self):
+        self._loop = None
+        self._emitter.shutdown(wait=False)
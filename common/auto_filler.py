@@ -0,0 +1,71 @@
+import asyncio
+
+from common.agent_functions import WEBSOCKET_FUNCTIONS
+from common.business_logic import prepare_agent_filler_message
+from common.config import FILLER_CONFIG
+from common.metrics import METRICS
+
+METRICS.describe("voice_agent_auto_filler_total", "User turns with a function call in auto filler mode, by whether a filler was spoken")
+
+
+class AutoFiller:
+    """
+    Says a filler phrase for the agent when a function call runs long, in
+    place of the LLM calling agent_filler before every lookup.
+
+    arm() starts a timer when a FunctionCallRequest arrives; if the call has
+    not been answered within threshold_secs the filler's cached audio is
+    played through play_cached(), which returns False when the phrase is
+    not in the phrase cache. Nothing is injected, since the agent would get
+    an InjectAgentMessage while its FunctionCallRequest is unanswered. At
+    most one filler is said per user turn, and a turn whose calls all finish
+    in time gets none. Every turn with a function call is an agent_filler
+    round trip the LLM no longer makes.
+    """
+
+    def __init__(self, play_cached, logger, config=FILLER_CONFIG):
+        self.play_cached = play_cached
+        self.logger = logger
+        self.config = config
+        self.enabled = config["mode"] == "auto"
+        self._turn_has_call = False
+        self._said_this_turn = False
+        self._task = None
+        self.stats = {"turns": 0, "spoken": 0}
+
+    def new_turn(self):
+        """The caller spoke; the next function call may get a filler again."""
+        self._turn_has_call = False
+        self._said_this_turn = False
+
+    def arm(self, function_name):
+        """Start the filler timer for one function call; cancel the returned handle once it is answered."""
+        if not self.enabled or function_name in WEBSOCKET_FUNCTIONS:
+            return None
+        if not self._turn_has_call:
+            self._turn_has_call = True
+            self.stats["turns"] += 1
+        if self._said_this_turn:
+            return None
+        return asyncio.get_running_loop().call_later(self.config["threshold_secs"], self._fire, function_name)
+
+    def _fire(self, function_name):
+        if self._said_this_turn:
+            return
+        self._said_this_turn = True
+        self.logger.info(f"{function_name} still running after {self.config['threshold_secs']}s; saying a filler")
+        self._task = asyncio.create_task(self._say())
+
+    async def _say(self):
+        try:
+            prepared = await prepare_agent_filler_message(None, self.config["message_type"])
+            if await self.play_cached(prepared["inject_message"]):
+                self.stats["spoken"] += 1
+            else:
+                self.logger.info("Filler phrase is not in the phrase cache yet; not saying it")
+        except Exception as e:
+            self.logger.error(f"Error saying filler: {e}")
+
+    def summary(self):
+        """Return (turns with a function call, fillers spoken); each turn saved an agent_filler round trip."""
+        return self.stats["turns"], self.stats["spoken"]
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import numpy as np
+
+from common.config import BILL_ANOMALY_CONFIG
+
+
+def _table(customer_ids, periods, values):
+    """Customers x periods matrix of summed values (NaN where a customer has none), columns oldest first."""
+    customers, rows = np.unique(customer_ids, return_inverse=True)
+    columns_index, columns = np.unique(periods, return_inverse=True)
+    sums = np.zeros((len(customers), len(columns_index)))
+    np.add.at(sums, (rows, columns), values)
+    present = np.zeros(sums.shape, dtype=bool)
+    present[rows, columns] = True
+    return customers, columns_index, np.where(present, sums, np.nan)
+
+
+def _baseline(history):
+    """Per-row mean, standard deviation and count of the non-NaN values, without NaN warnings."""
+    present = ~np.isnan(history)
+    count = present.sum(axis=1)
+    filled = np.where(present, history, 0.0)
+    mean = filled.sum(axis=1) / np.maximum(count, 1)
+    variance = np.where(present, (history - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(count, 1)
+    return mean, np.sqrt(variance), count
+
+
+def _zscore(value, mean, std):
+    return np.divide(value - mean, std, out=np.zeros_like(mean), where=std > 0)
+
+
+def _bill_scores(billing_history, config):
+    """Latest bill of every customer against the customer's earlier bills."""
+    customers, dates, amounts = _table(
+        [bill["customer_id"] for bill in billing_history],
+        [bill["bill_date"][:10] for bill in billing_history],
+        np.array([bill["total_amount"] for bill in billing_history], dtype=float),
+    )
+    rows = np.arange(len(customers))
+    # Column of each customer's most recent bill
+    latest = amounts.shape[1] - 1 - np.argmax(~np.isnan(amounts[:, ::-1]), axis=1)
+    latest_amount = amounts[rows, latest]
+    history = amounts.copy()
+    history[rows, latest] = np.nan
+    mean, std, count = _baseline(history)
+    z = np.where(count >= config["min_history_bills"], _zscore(latest_amount, mean, std), 0.0)
+    return customers, dates[latest], latest_amount, mean, z
+
+
+def _usage_scores(usage_data, config):
+    """Mean daily usage over the recent days of every customer against the earlier days."""
+    customers, _, daily = _table(
+        [row["customer_id"] for row in usage_data],
+        [row["date"][:10] for row in usage_data],
+        np.array([row["total_kwh"] for row in usage_data], dtype=float),
+    )
+    recent_days = config["recent_days"]
+    recent_mean, _, recent_count = _baseline(daily[:, -recent_days:])
+    mean, std, count = _baseline(daily[:, :-recent_days])
+    # The recent figure is a mean of several days, so it is compared against the standard error
+    z = _zscore(recent_mean, mean, std / np.sqrt(np.maximum(recent_count, 1)))
+    z = np.where((count >= config["min_baseline_days"]) & (recent_count > 0), z, 0.0)
+    return customers, recent_mean, mean, z
+
+
+def detect_bill_anomalies(billing_history, usage_data, config=BILL_ANOMALY_CONFIG):
+    """
+    Score every customer in one pass and return the flagged ones, keyed by
+    customer ID. A customer is flagged when their latest bill, or their
+    mean daily usage over the last recent_days, is more than z_threshold
+    standard deviations above their own baseline.
+    """
+    flagged = {}
+    flagged_at = datetime.now().isoformat(timespec="seconds")
+    threshold = config["z_threshold"]
+
+    if billing_history:
+        customers, dates, latest, usual, z = _bill_scores(billing_history, config)
+        for i in np.flatnonzero(z > threshold):
+            flagged[str(customers[i])] = {
+                "flagged_at": flagged_at,
+                "reasons": ["latest_bill_high"],
+                "latest_bill_date": str(dates[i]),
+                "latest_bill_amount": round(float(latest[i]), 2),
+                "usual_bill_amount": round(float(usual[i]), 2),
+                "bill_z": round(float(z[i]), 2),
+            }
+
+    if usage_data:
+        customers, recent, usual, z = _usage_scores(usage_data, config)
+        for i in np.flatnonzero(z > threshold):
+            entry = flagged.setdefault(str(customers[i]), {"flagged_at": flagged_at, "reasons": []})
+            entry["reasons"].append("recent_usage_high")
+            entry["recent_daily_kwh"] = round(float(recent[i]), 2)
+            entry["usual_daily_kwh"] = round(float(usual[i]), 2)
+            entry["usage_z"] = round(float(z[i]), 2)
+
+    return flagged
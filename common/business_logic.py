@@ -2,10 +2,14 @@ import asyncio
 import json
 from datetime import datetime, timedelta
 import random
-from common.config import ARTIFICIAL_DELAY, MOCK_DATA_SIZE
+from common.bill_anomalies import detect_bill_anomalies
+from common.config import ARTIFICIAL_DELAY, BILL_ANOMALY_CONFIG, MOCK_DATA_SIZE
+from common.usage_analytics import usage_insights
 import pathlib
 import csv
 import os
+import threading
+import time
 
 
 def save_mock_data(data):
@@ -38,7 +42,14 @@ def cleanup_mock_data_files(output_dir):
 
 
 # Mock data generation
-def generate_mock_data():
+def generate_mock_data(sizes=MOCK_DATA_SIZE, save=True):
+    """
+    Generate the mock dataset.
+
+    Args:
+        sizes (dict): Entity counts in the shape of MOCK_DATA_SIZE
+        save (bool): Also write the data to mock_data_outputs
+    """
     customers = []
     appointments = []
     contracts = []
@@ -50,14 +61,16 @@ def generate_mock_data():
     sg_names = ["Justin Lee", "Wei Ling Tan", "Muhammad Bin Abdullah", "Siti Binte Zainudin", "Raj Patel"]
     
     # Generate customers with realistic Singapore names
-    for i in range(MOCK_DATA_SIZE["customers"]):
-        name = sg_names[i]
+    for i in range(sizes["customers"]):
+        name = sg_names[i % len(sg_names)]
         first_name = name.split()[0].lower()
+        # Names repeat beyond the first few customers, so later emails carry the index
+        email = f"{first_name}@example.com" if i < len(sg_names) else f"{first_name}{i}@example.com"
         customer = {
             "id": f"CUST{i:04d}",
             "name": name,
             "phone": f"+65{random.randint(80000000, 99999999)}",  # Singapore mobile number format
-            "email": f"{first_name}@example.com",
+            "email": email,
             "address": f"Block {random.randint(1, 999)}, #{random.randint(1, 20)}-{random.randint(1, 99)}, Singapore {random.randint(100000, 999999)}",
             "joined_date": (
                 datetime.now() - timedelta(days=random.randint(0, 730))
@@ -66,7 +79,7 @@ def generate_mock_data():
         customers.append(customer)
 
     # Generate appointments
-    for i in range(MOCK_DATA_SIZE["appointments"]):
+    for i in range(sizes["appointments"]):
         customer = random.choice(customers)
         appointment = {
             "id": f"APT{i:04d}",
@@ -90,7 +103,7 @@ def generate_mock_data():
         appointments.append(appointment)
 
     # Generate energy contracts
-    for i in range(MOCK_DATA_SIZE["orders"]):  # Using orders size for contracts
+    for i in range(sizes["orders"]):  # Using orders size for contracts
         customer = random.choice(customers)
         plan_types = ["Fixed Price Plan", "Discount Off Tariff", "Peak/Off-Peak Plan", "Green Energy Plan"]
         contract_terms = [6, 12, 24, 36]  # Months
@@ -118,7 +131,7 @@ def generate_mock_data():
         contracts.append(contract)
         
         # Generate billing history for each contract
-        for month in range(6):  # Last 6 months of billing
+        for month in range(sizes["billing_months"]):  # Last months of billing
             bill_date = datetime.now() - timedelta(days=30 * month)
             if bill_date > start_date:  # Only generate bills after contract start date
                 # Calculate usage with some randomness but trending with seasons
@@ -333,7 +346,8 @@ def generate_mock_data():
     }
 
     # Save the mock data
-    save_mock_data(mock_data)
+    if save:
+        save_mock_data(mock_data)
 
     return mock_data
 
@@ -341,6 +355,40 @@ def generate_mock_data():
 # Initialize mock data
 MOCK_DATA = generate_mock_data()
 
+# Customers flagged by the bill anomaly batch job, keyed by customer ID
+BILL_ANOMALIES = {}
+
+
+def refresh_bill_anomalies():
+    """Rerun bill anomaly detection across every customer and replace the index."""
+    global BILL_ANOMALIES
+    if BILL_ANOMALY_CONFIG["enabled"]:
+        BILL_ANOMALIES = detect_bill_anomalies(MOCK_DATA["billing_history"], MOCK_DATA["usage_data"])
+    return BILL_ANOMALIES
+
+
+def start_bill_anomaly_job(interval_secs=BILL_ANOMALY_CONFIG["refresh_interval_secs"]):
+    """
+    Refresh the bill anomaly index every interval_secs on a daemon thread.
+    Returns an Event that stops the job when set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval_secs):
+            try:
+                refresh_bill_anomalies()
+            except Exception as e:
+                print(f"Warning: bill anomaly refresh failed: {e}")
+
+    threading.Thread(target=run, name="bill-anomaly-job", daemon=True).start()
+    return stop
+
+
+refresh_bill_anomalies()
+if BILL_ANOMALY_CONFIG["enabled"] and BILL_ANOMALY_CONFIG["refresh_interval_secs"]:
+    start_bill_anomaly_job()
+
 
 # Complaint handling functionality
 def save_complaint(name, address, complaint_details):
@@ -390,9 +438,12 @@ def save_complaint(name, address, complaint_details):
     }
 
 
-async def handle_complaint(customer_id, complaint_details):
+def handle_complaint(customer_id, complaint_details):
     """
     Handle a customer complaint.
+
+    Blocking: reads and appends to the complaints CSV, so it is registered to
+    run on the thread pool rather than the event loop.
     
     Args:
         customer_id (str): Customer ID
@@ -401,13 +452,13 @@ async def handle_complaint(customer_id, complaint_details):
     Returns:
         dict: Information about the processed complaint
     """
-    await simulate_delay("database")
+    simulate_blocking_delay("database")
     
     # Find the customer
-    customer = await get_customer(customer_id=customer_id)
+    customer = lookup_customer(customer_id=customer_id)
     
-    if not customer:
-        return {"error": "Customer not found"}
+    if "error" in customer:
+        return customer
     
     # Save the complaint
     complaint = save_complaint(
@@ -428,10 +479,20 @@ async def simulate_delay(delay_type):
     await asyncio.sleep(ARTIFICIAL_DELAY[delay_type])
 
 
+def simulate_blocking_delay(delay_type):
+    """Simulate processing delay for functions that run on a worker thread."""
+    time.sleep(ARTIFICIAL_DELAY[delay_type])
+
+
 async def get_customer(phone=None, email=None, customer_id=None):
     """Look up a customer by phone, email, or ID."""
     await simulate_delay("database")
 
+    return lookup_customer(phone=phone, email=email, customer_id=customer_id)
+
+
+def lookup_customer(phone=None, email=None, customer_id=None):
+    """Look up a customer by phone, email, or ID without any simulated delay."""
     if phone:
         customer = next(
             (c for c in MOCK_DATA["customers"] if c["phone"] == phone), None
@@ -447,7 +508,11 @@ async def get_customer(phone=None, email=None, customer_id=None):
     else:
         return {"error": "No search criteria provided"}
 
-    return customer if customer else {"error": "Customer not found"}
+    if not customer:
+        return {"error": "Customer not found"}
+    # Flagged by the batch job, so the agent can raise it without pulling the history
+    anomaly = BILL_ANOMALIES.get(customer["id"])
+    return {**customer, "bill_anomaly": anomaly} if anomaly else customer
 
 
 async def get_customer_appointments(customer_id):
@@ -488,6 +553,16 @@ async def get_customer_usage(customer_id, days=30):
     return {"customer_id": customer_id, "usage_data": usage}
 
 
+async def get_customer_usage_insights(customer_id):
+    """Get precomputed usage, bill and plan statistics for a customer."""
+    await simulate_delay("database")
+
+    usage = [u for u in MOCK_DATA["usage_data"] if u["customer_id"] == customer_id]
+    bills = [b for b in MOCK_DATA["billing_history"] if b["customer_id"] == customer_id]
+    contracts = [c for c in MOCK_DATA["contracts"] if c["customer_id"] == customer_id]
+    return {"customer_id": customer_id, **usage_insights(usage, bills, contracts)}
+
+
 async def get_customer_payment_methods(customer_id):
     """Get payment methods for a customer."""
     await simulate_delay("database")
@@ -593,9 +668,12 @@ async def prepare_farewell_message(websocket, farewell_type):
     }
 
 
-async def request_new_service(customer_name, phone, email, address, service_type, details):
+def request_new_service(customer_name, phone, email, address, service_type, details):
     """
     Handle a request for a new service connection or modification.
+
+    Blocking: rewrites the mock data file, so it is registered to run on the
+    thread pool rather than the event loop.
     
     Args:
         customer_name (str): Customer name
@@ -608,14 +686,16 @@ async def request_new_service(customer_name, phone, email, address, service_type
     Returns:
         dict: Information about the processed request
     """
-    await simulate_delay("database")
+    simulate_blocking_delay("database")
     
     # Check if customer already exists
     existing_customer = None
     if phone:
-        existing_customer = await get_customer(phone=phone)
-    if not existing_customer and email:
-        existing_customer = await get_customer(email=email)
+        existing_customer = lookup_customer(phone=phone)
+    if (not existing_customer or "error" in existing_customer) and email:
+        existing_customer = lookup_customer(email=email)
+    if existing_customer and "error" in existing_customer:
+        existing_customer = None
     
     # Create a new customer if they don't exist
     if not existing_customer:
@@ -637,6 +717,7 @@ async def request_new_service(customer_name, phone, email, address, service_type
         
         # Save updated mock data
         save_mock_data(MOCK_DATA)
+        refresh_bill_anomalies()
         
         customer_id = new_id
     else:
@@ -13,9 +13,197 @@ MOCK_DATA_SIZE = {
     "billing_months": 6  # Number of months of billing history to generate
 }
 
+# Usage analytics returned by get_usage_insights (see common.usage_analytics)
+USAGE_ANALYTICS_CONFIG = {
+    "anomaly_z": 2.0,  # Standard deviations above the mean that flag a day or bill as unusual
+    "month_change_alert_pct": 20.0,  # Month-over-month usage increase flagged as an anomaly
+    "default_peak_share": 0.6,  # Assumed share of peak usage when the meter does not split it
+    "plan_rates": {  # $ per kWh used to project each plan's monthly cost
+        "Fixed Price Plan": 0.24,
+        "Discount Off Tariff": 0.25,
+        "Peak/Off-Peak Plan": {"peak": 0.29, "off_peak": 0.16},
+        "Green Energy Plan": 0.27,
+    },
+}
+
+# Batch bill anomaly detection; flagged customers are reported by find_customer
+BILL_ANOMALY_CONFIG = {
+    "enabled": True,
+    "z_threshold": 3.0,  # Standard deviations above the customer's own baseline that flag a bill or recent usage
+    "min_history_bills": 3,  # Earlier bills needed before the latest bill is scored
+    "recent_days": 7,  # Days of recent usage compared against the earlier days
+    "min_baseline_days": 14,
+    "refresh_interval_secs": 3600.0,  # How often the job reruns while the app is up; None runs it only at start and on data writes
+}
+
 # Database settings (if using SQLite)
 # Not in use in this reference implementation but left as an example for how to potentially integrate with a DB
 DATABASE_CONFIG = {
     "path": "business_data.db",
     "enable": False  # Set to True to use actual SQLite instead of mock data
-} 
\ No newline at end of file
+} 
+
+# Local voice activity detection for microphone audio sent to the agent
+VAD_CONFIG = {
+    "enabled": True,
+    "frame_ms": 10,  # Sub-frame length used for the RMS / zero-crossing features
+    "energy_threshold_dbfs": -45.0,  # Frames louder than this are treated as speech
+    "noise_margin_db": 10.0,  # Speech must also be this far above the tracked noise floor
+    "zcr_range": (0.05, 0.45),  # Zero-crossing rate of quiet unvoiced sounds ("s", "f", "th")
+    "zcr_energy_margin_db": 8.0,  # How far below the energy threshold such sounds may be
+    "hangover_ms": 400,  # Keep sending after the last speech frame so word endings are not clipped
+    "preroll_ms": 150,  # Suppressed audio replayed on onset so the first syllable is not lost
+    "silence_mode": "keepalive",  # "keepalive" (JSON KeepAlive messages) or "comfort" (sparse silent frames)
+    "keepalive_interval_secs": 5.0,  # Well inside the server's idle timeout, so idle connections stay open
+    "comfort_frame_interval_secs": 1.0,
+    "onset_window_ms": 1500,  # Server speech events without a local onset this recent count as missed
+}
+
+# Agent audio playback
+PLAYBACK_CONFIG = {
+    "block_ms": 20,  # Output block size; a barge-in flush silences audio within one block
+    "jitter_target_ms": 120,  # Audio buffered before playback starts or resumes after an underrun
+    "capacity_secs": 60,  # Size of the preallocated PCM ring buffer
+}
+
+# Pauses the receiver inserts at turn boundaries
+PACING_CONFIG = {
+    "mode": "event",  # "event" waits only for agent audio still queued in the Speaker; "fixed" uses fixed_delays
+    "fixed_delays": {  # Original hard-coded sleeps (seconds)
+        "assistant_text": 1.5,
+        "function_call": 0.5,
+        "farewell": 3.5,
+    },
+    "naturalness_delays": {  # Optional extra pauses (seconds) added in event mode
+        "assistant_text": 0.0,
+        "function_call": 0.0,
+        "farewell": 0.2,
+    },
+}
+
+# Execution timeouts (seconds) for agent function calls
+FUNCTION_TIMEOUTS = {
+    "default": 10.0,
+    "agent_filler": 2.0,
+    "end_call": 2.0,
+}
+
+# Filler phrases while function calls run: "llm" has the agent call agent_filler
+# before lookups; "auto" drops that tool and the client plays a cached filler
+# itself only when a call is still running after threshold_secs. Until the
+# phrase cache holds the filler (e.g. from "llm" calls), "auto" says none
+FILLER_CONFIG = {
+    "mode": "llm",
+    "threshold_secs": 0.7,
+    "message_type": "lookup",  # agent_filler message type whose phrase is said
+}
+
+# Circuit breakers and stale fallback for agent functions (deadlines are FUNCTION_TIMEOUTS)
+RESILIENCE_CONFIG = {
+    "failure_threshold": 3,  # Consecutive timeouts or exceptions that open a function's breaker
+    "reset_timeout_secs": 15.0,  # Time an open breaker refuses calls before letting one trial call through
+    "max_stale_secs": 300.0,  # Oldest cached read result returned, marked stale, for a failed call
+    "max_cached_results": 1000,
+}
+
+# Conversation stages: which tools the agent is offered as the call moves forward
+STAGE_CONFIG = {
+    # Off until re-sending SettingsConfiguration mid-call is verified against the live
+    # Agent API; only the mock server has been tried, and it ignores the update
+    "enabled": False,  # False offers every tool from the start
+    "chars_per_token": 4,  # Rough token estimate for the prompt and tool schema
+}
+
+# Worker pools for agent functions declared "blocking_io" or "cpu_bound"
+EXECUTOR_CONFIG = {
+    "thread_pool_size": 8,  # Blocking file / database I/O
+    "process_pool_size": None,  # CPU-bound work; None uses the number of CPUs
+}
+
+# Concurrent execution of function calls the agent sends back to back
+CONCURRENCY_CONFIG = {
+    "enabled": True,  # False runs every call after the one before it
+}
+
+# Merging of identical concurrent function calls
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": True,
+    "idempotency_window_secs": 30.0,  # An identical write repeated within this window returns the first result
+}
+
+# Latency metrics served from /metrics
+METRICS_CONFIG = {
+    "window": 1024,  # Recent observations per summary used for the p50/p95/p99 quantiles
+}
+
+# Per-call span traces written as rotating JSONL
+TRACE_CONFIG = {
+    "enabled": True,
+    "sample_rate": 1.0,  # Fraction of calls traced
+    "path": "traces/voice_agent_traces.jsonl",
+    "max_bytes": 10 * 1024 * 1024,  # Rotate the trace file at this size
+    "backup_count": 5,
+    "flush_every": 200,  # Spans buffered before they are handed to the writer thread
+    "trace_audio_messages": False,  # One span per audio chunk instead of just byte counts
+    "queue_depth_interval_secs": 0.25,  # How often the speaker queue depth is sampled
+    "max_parameter_chars": 512,
+}
+
+# Log pipeline: records are queued and formatted off the event loop
+LOG_CONFIG = {
+    "queue_size": 10000,  # Records waiting for the listener thread; extra records are dropped
+    "max_records_per_sec": 200,  # Lines forwarded to the browser per second; the rest are counted as dropped
+}
+
+# Browser updates: events are sent to each client in acknowledged frames
+UI_CONFIG = {
+    "frame_interval_ms": 100,  # How often a frame is sent to each browser
+    "history_size": 2000,  # Events kept per session room for late joiners and lagging clients
+    "max_unacked_frames": 2,  # A client with this many frames unacknowledged is skipped until it catches up
+    "ack_timeout_secs": 5.0,  # Resume sending to a client whose acknowledgements never arrived
+    "max_logs_per_frame": 50,  # Older log lines beyond this are skipped for clients that fell behind
+    "room_linger_secs": 30.0,  # How long a finished call's room is kept
+}
+
+# Recording of agent sessions for replay by mock_agent_server.py
+RECORDING_CONFIG = {
+    "enabled": False,
+    "directory": "recordings",
+    "flush_every": 50,  # Messages buffered before they are handed to the writer thread
+}
+
+# Audio encoding on the agent websocket, in both directions: "linear16", or
+# "mulaw" for 8-bit G.711, which halves the audio bytes per call
+AUDIO_CODEC_CONFIG = {
+    "encoding": "linear16",
+}
+
+# Pre-connected agent websockets, so a call does not wait for the handshake and settings
+CONNECTION_POOL_CONFIG = {
+    "enabled": True,
+    "size": 1,  # Idle connections kept ready; each is an open agent session
+    "idle_shutdown_secs": 300.0,  # Stop keeping connections ready after this long without a call or page visit
+    "keepalive_interval_secs": 5.0,  # Well inside the server's idle timeout, so idle connections stay open
+    "check_interval_secs": 1.0,
+    "retry_delay_secs": 5.0,  # Wait after a failed connection attempt
+    "close_timeout_secs": 2.0,
+}
+
+# Resuming a call on a new connection when the agent websocket drops
+RECONNECT_CONFIG = {
+    "enabled": True,
+    "max_attempts": 5,
+    "initial_backoff_secs": 0.1,  # The first attempt is immediate; later ones back off exponentially
+    "max_backoff_secs": 2.0,
+    "max_buffered_audio_secs": 10.0,  # Microphone audio kept for the new connection; older audio is dropped
+    "max_history_messages": 50,  # Conversation messages sent as context to the new connection
+    "close_timeout_secs": 2.0,
+}
+
+# Agent audio for fixed injected phrases (fillers, farewells), saved after the
+# agent first speaks them and played locally on later calls
+PHRASE_CACHE_CONFIG = {
+    "enabled": True,
+    "directory": "phrase_cache",  # One subdirectory per voice and sample rate; others are deleted
+    "min_audio_secs": 0.3,  # Shorter captures are treated as cut off and not cached
+}
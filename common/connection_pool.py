@@ -0,0 +1,168 @@
+import asyncio
+import time
+from datetime import date
+
+from common.config import CONNECTION_POOL_CONFIG
+from common.metrics import METRICS
+from common.vad import KEEPALIVE_MESSAGE
+
+
+class PooledConnection:
+    __slots__ = ("ws", "day")
+
+    def __init__(self, ws):
+        self.ws = ws
+        # The prompt sent with the settings carries the date
+        self.day = date.today()
+
+
+class AgentConnectionPool:
+    """
+    Keeps a few agent websockets connected, authenticated and configured
+    ahead of time, so a call starts without waiting for the TLS handshake
+    and settings negotiation.
+
+    connect is a coroutine function returning a websocket whose settings
+    have already been sent. Idle connections are kept alive with KeepAlive
+    messages, so the server never times them out, and are only retired when
+    they close or the date in their prompt goes stale; each retirement opens
+    a new billable session with a newly generated greeting.
+
+    Every pooled connection is a billable agent session, so the pool only
+    refills while it is in demand: after idle_shutdown_secs without a call
+    or a touch() (e.g. a page opening), or after stand_down(), it closes
+    its idle connections and waits. The next touch() or acquire() warms it
+    again. The pool must be used from the event loop it was started on.
+    """
+
+    def __init__(self, connect, logger, config=CONNECTION_POOL_CONFIG):
+        self.connect = connect
+        self.logger = logger
+        self.config = config
+        self._idle = []
+        self._connecting = 0
+        self._wake = asyncio.Event()
+        self._task = None
+        self._tasks = set()
+        self._last_demand = time.monotonic()
+        self.stats = {"opened": 0, "handed_out": 0, "misses": 0, "retired": 0, "failed": 0}
+        METRICS.register_collector(self._samples)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._maintain())
+
+    def touch(self):
+        """Note that a call may be coming, so connections are kept ready."""
+        self._last_demand = time.monotonic()
+        self._wake.set()
+
+    def stand_down(self):
+        """Close the idle connections and stop refilling until the next touch() or acquire()."""
+        self._last_demand = None
+        self._wake.set()
+
+    def _in_demand(self):
+        return (
+            self._last_demand is not None
+            and time.monotonic() - self._last_demand < self.config["idle_shutdown_secs"]
+        )
+
+    async def acquire(self):
+        """Return (websocket, True) from the pool, or (a new websocket, False) if none is ready."""
+        self.touch()
+        while self._idle:
+            connection = self._idle.pop(0)
+            if self._usable(connection):
+                self.stats["handed_out"] += 1
+                return connection.ws, True
+            self._retire(connection)
+
+        self.stats["misses"] += 1
+        return await self.connect(), False
+
+    def _usable(self, connection):
+        return connection.ws.open and connection.day == date.today()
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _retire(self, connection):
+        """Close a connection in the background so callers never wait for the close handshake."""
+        self.stats["retired"] += 1
+        self._spawn(self._close(connection.ws))
+
+    async def _close(self, ws):
+        try:
+            await asyncio.wait_for(ws.close(), self.config["close_timeout_secs"])
+        except Exception:
+            pass
+
+    async def _open(self):
+        self._connecting += 1
+        try:
+            connection = PooledConnection(await self.connect())
+            self._idle.append(connection)
+            self.stats["opened"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.logger.error(f"Failed to pre-connect agent websocket: {e}")
+            # Back off before the next attempt
+            await asyncio.sleep(self.config["retry_delay_secs"])
+        finally:
+            self._connecting -= 1
+
+    async def _maintain(self):
+        last_keepalive = time.monotonic()
+        while True:
+            in_demand = self._in_demand()
+            for connection in list(self._idle):
+                if not in_demand or not self._usable(connection):
+                    self._idle.remove(connection)
+                    self._retire(connection)
+
+            if time.monotonic() - last_keepalive >= self.config["keepalive_interval_secs"]:
+                last_keepalive = time.monotonic()
+                for connection in list(self._idle):
+                    try:
+                        await connection.ws.send(KEEPALIVE_MESSAGE)
+                    except Exception:
+                        # A call may have taken it while the send was pending
+                        if connection in self._idle:
+                            self._idle.remove(connection)
+                            self._retire(connection)
+
+            missing = self.config["size"] - len(self._idle) - self._connecting if in_demand else 0
+            for _ in range(missing):
+                self._spawn(self._open())
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.config["check_interval_secs"])
+            except asyncio.TimeoutError:
+                pass
+
+    def _samples(self):
+        return [
+            (
+                "voice_agent_connection_pool_idle",
+                "gauge",
+                "Pre-connected agent websockets waiting for a call",
+                [({}, len(self._idle))],
+            ),
+            (
+                "voice_agent_connection_pool_total",
+                "counter",
+                "Agent websocket pool events",
+                [({"event": event}, count) for event, count in self.stats.items()],
+            ),
+        ]
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        while self._idle:
+            await self._close(self._idle.pop().ws)
@@ -0,0 +1,109 @@
+import json
+import re
+
+from common.agent_functions import FUNCTION_DEFINITIONS, FUNCTION_GROUPS, IDENTIFY_FUNCTIONS
+from common.config import FILLER_CONFIG, STAGE_CONFIG
+from common.metrics import METRICS
+
+# What the caller says that brings each FUNCTION_GROUPS topic into the call
+TOPIC_PATTERNS = {
+    "account": re.compile(r"\b(contract|plan|account|rate|tariff|renew|pay(ment)?s?\b|card)", re.IGNORECASE),
+    "billing": re.compile(
+        r"\b(bill|charge|usage|used|kwh|kilowatt|consum|cost|paid|owe|expensive|payment)", re.IGNORECASE
+    ),
+    "scheduling": re.compile(
+        r"\b(appointment|book|schedul|slot|visit|technician|availab|come (out|over)|meter read)", re.IGNORECASE
+    ),
+    "complaint": re.compile(
+        r"\b(complain|outage|power cut|blackout|problem|issue|unhappy|disappoint|frustrat)", re.IGNORECASE
+    ),
+}
+
+# A question or request, as opposed to an acknowledgement like "Yes, that's right."
+REQUEST_PATTERN = re.compile(
+    r"\?|^\W*(what|how|when|where|why|who|which|can|could|would|will|do|does|did|is|are|have|has)\b"
+    r"|\b(need|want|like to|help|fix|check|tell me|look(ing)? (into|for|up)|find out|change|cancel|update|move)\b",
+    re.IGNORECASE,
+)
+
+METRICS.describe("voice_agent_context_tokens", "Estimated prompt and tool schema tokens in effect for each user turn")
+METRICS.describe("voice_agent_llm_decision_seconds", "Time from the user's words (or a function response) to the agent's function call")
+
+
+def estimate_tokens(text, config=STAGE_CONFIG):
+    return -(-len(text) // config["chars_per_token"])
+
+
+class ConversationStages:
+    """
+    Decides which tools the agent is offered on one call, so each turn's
+    context carries only the function schemas the call can use yet.
+
+    A call starts in the "identify" stage with IDENTIFY_FUNCTIONS. Once
+    find_customer succeeds, every FUNCTION_GROUPS topic the caller has
+    raised so far is unlocked, and later topics are unlocked as they come
+    up. TOPIC_PATTERNS cannot recognise every request, so every group is
+    unlocked ("all") when the customer is identified before any topic was
+    raised, or when a later question or request (REQUEST_PATTERN) raises
+    none. Tools are only ever added, so the agent never loses one
+    mid-task.
+    With staging disabled every tool is offered from the start ("full").
+    agent_filler is never offered in auto filler mode.
+    """
+
+    def __init__(self, config=STAGE_CONFIG, definitions=FUNCTION_DEFINITIONS, filler_config=FILLER_CONFIG):
+        self.config = config
+        self.enabled = config["enabled"]
+        if filler_config["mode"] == "auto":
+            # The client says fillers itself (see common.auto_filler)
+            definitions = [definition for definition in definitions if definition["name"] != "agent_filler"]
+        self.definitions = definitions
+        self.identified = False
+        self.topics = set()
+        self.unlocked = set()
+
+    @property
+    def stage(self):
+        if not self.enabled:
+            return "full"
+        if not self.identified:
+            return "identify"
+        if self.unlocked == set(FUNCTION_GROUPS):
+            return "all"
+        return "+".join(sorted(self.unlocked)) or "identified"
+
+    def functions(self):
+        if not self.enabled:
+            return list(self.definitions)
+        names = set(IDENTIFY_FUNCTIONS)
+        for group in self.unlocked:
+            names.update(FUNCTION_GROUPS[group])
+        return [definition for definition in self.definitions if definition["name"] in names]
+
+    def context_tokens(self, instructions):
+        """Estimated tokens of the instructions and offered tool schemas, sent to the LLM every turn."""
+        return estimate_tokens(instructions + json.dumps(self.functions()), self.config)
+
+    def observe_user_text(self, text):
+        """Note the topics the caller raised; returns True if that unlocked new tools."""
+        topics = {topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.search(text)}
+        if not topics and self.identified and REQUEST_PATTERN.search(text):
+            # A request the topic patterns do not recognise
+            topics = set(FUNCTION_GROUPS)
+        self.topics |= topics
+        return self._unlock()
+
+    def observe_result(self, function_name, result):
+        """Note a function result; returns True if that unlocked new tools."""
+        if function_name == "find_customer" and isinstance(result, dict) and "error" not in result:
+            if not self.identified and not self.topics:
+                # Whatever the caller wants was not recognised before identification
+                self.topics = set(FUNCTION_GROUPS)
+            self.identified = True
+        return self._unlock()
+
+    def _unlock(self):
+        if not self.enabled or not self.identified or self.topics <= self.unlocked:
+            return False
+        self.unlocked |= self.topics
+        return True
@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from common.config import EXECUTOR_CONFIG
+from common.metrics import METRICS
+
+# How an agent function is executed:
+# - "async": a coroutine function awaited on the event loop
+# - "blocking_io": a plain function run on the shared thread pool
+# - "cpu_bound": a plain, picklable function run on the shared process pool. It must
+#   live in a module that can be imported without side effects, and it only sees
+#   its arguments, not in-memory state such as MOCK_DATA.
+EXECUTION_MODES = ("async", "blocking_io", "cpu_bound")
+
+_pool_lock = threading.Lock()
+_thread_pool = None
+_process_pool = None
+
+
+def get_thread_pool():
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(
+                max_workers=EXECUTOR_CONFIG["thread_pool_size"],
+                thread_name_prefix="agent-io",
+            )
+        return _thread_pool
+
+
+def get_process_pool():
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=EXECUTOR_CONFIG["process_pool_size"])
+        return _process_pool
+
+
+def shutdown_pools():
+    global _thread_pool, _process_pool
+    with _pool_lock:
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+        _process_pool = None
+
+
+class LatencyStats:
+    """Per-function call counts and latencies, shared by every session in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds, queue_wait=0.0, failed=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                name,
+                {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "queue_wait_total": 0.0},
+            )
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["queue_wait_total"] += queue_wait
+
+    def snapshot(self):
+        """Return {name: {count, errors, avg, max, avg_queue_wait}}."""
+        with self._lock:
+            return {
+                name: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "avg": s["total"] / s["count"],
+                    "max": s["max"],
+                    "avg_queue_wait": s["queue_wait_total"] / s["count"],
+                }
+                for name, s in self._stats.items()
+            }
+
+
+FUNCTION_LATENCY = LatencyStats()
+
+
+def _function_latency_samples():
+    snapshot = FUNCTION_LATENCY.snapshot()
+    return [
+        (
+            "voice_agent_function_errors_total",
+            "counter",
+            "Agent function calls that failed or timed out",
+            [({"function": name}, s["errors"]) for name, s in snapshot.items()],
+        ),
+        (
+            "voice_agent_function_pool_queue_wait_seconds_avg",
+            "gauge",
+            "Average time pooled agent functions waited for a free worker",
+            [({"function": name}, f"{s['avg_queue_wait']:.6f}") for name, s in snapshot.items()],
+        ),
+    ]
+
+
+METRICS.register_collector(_function_latency_samples)
+
+
+def _timed_call(func, *args):
+    """Run func in a worker and return (result, time the worker started)."""
+    return func(*args), time.time()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the thread pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_in_pool(mode, func, *args):
+    """
+    Run a "blocking_io" or "cpu_bound" function on its pool.
+
+    Returns (result, queue_wait), where queue_wait is how long the call waited
+    for a free worker.
+    """
+    if mode == "blocking_io":
+        pool = get_thread_pool()
+    elif mode == "cpu_bound":
+        pool = get_process_pool()
+    else:
+        raise ValueError(f"Unknown execution mode {mode}")
+
+    loop = asyncio.get_running_loop()
+    submitted = time.time()
+    result, started = await loop.run_in_executor(pool, _timed_call, func, *args)
+    return result, max(0.0, started - submitted)
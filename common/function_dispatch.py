@@ -0,0 +1,274 @@
+import asyncio
+import json
+import time
+
+from common.agent_functions import FUNCTION_MAP, FUNCTION_MODES, WEBSOCKET_FUNCTIONS, WRITE_FUNCTIONS
+from common.config import CONCURRENCY_CONFIG, FUNCTION_TIMEOUTS
+from common.executors import FUNCTION_LATENCY, run_in_pool
+from common.metrics import METRICS
+from common.resilience import FUNCTION_GUARD
+from common.schema_validation import VALIDATORS
+from common.single_flight import SingleFlight
+
+
+class FunctionDispatcher:
+    """
+    Runs FunctionCallRequests as tracked tasks so the receive loop keeps
+    playing agent audio and handling barge-in while a function executes.
+    """
+
+    def __init__(
+        self,
+        ws,
+        logger,
+        function_map=FUNCTION_MAP,
+        timeouts=FUNCTION_TIMEOUTS,
+        modes=FUNCTION_MODES,
+        concurrency=CONCURRENCY_CONFIG,
+        validators=VALIDATORS,
+        guard=FUNCTION_GUARD,
+        timeline=None,
+        tracer=None,
+        before_response=None,
+        inject=None,
+        filler=None,
+    ):
+        self.ws = ws
+        self.logger = logger
+        self.timeline = timeline
+        self.tracer = tracer
+        # Awaited with each function's name and result before its response is sent
+        self.before_response = before_response
+        # Says filler messages (e.g. from the phrase cache) instead of sending them on ws
+        self.inject = inject
+        # AutoFiller armed for every call until its response is sent
+        self.filler = filler
+        self.function_map = function_map
+        self.timeouts = timeouts
+        self.modes = modes
+        self.concurrency = concurrency
+        self.validators = validators
+        self.guard = guard
+        # Identical calls pending at once share one execution; writes are idempotent
+        self.single_flight = SingleFlight(WRITE_FUNCTIONS)
+        self.tasks = set()
+        self.last_response_time = None
+        self.stats = {"overlapped": 0}
+        self._tail = None
+        # (task, customer_id, is_write) for every call still pending
+        self._pending = []
+        self._executing = 0
+
+    def _conflicts(self, function_name, parameters):
+        """Pending calls that must finish executing before this one starts."""
+        # Independent calls run concurrently, so a turn waits for its slowest
+        # lookup rather than their sum. A write for the same customer (or a
+        # call with no customer_id to tell) waits, so writes stay serialized
+        # per customer and reads see them.
+        if not self.concurrency["enabled"]:
+            return {self._tail} if self._tail is not None else set()
+        customer_id = parameters.get("customer_id")
+        is_write = function_name in WRITE_FUNCTIONS
+        return {
+            task
+            for task, other_customer_id, other_is_write in self._pending
+            if (is_write or other_is_write)
+            and (customer_id is None or other_customer_id is None or customer_id == other_customer_id)
+        }
+
+    def submit(self, function_call_id, function_name, parameters):
+        """Start a function call as a task and return it."""
+        filler_timer = self.filler.arm(function_name) if self.filler else None
+        depends_on = self._conflicts(function_name, parameters)
+        task = asyncio.create_task(
+            self._handle(function_call_id, function_name, parameters, self._tail, depends_on, filler_timer)
+        )
+        self._tail = task
+        self.tasks.add(task)
+        entry = (task, parameters.get("customer_id"), function_name in WRITE_FUNCTIONS)
+        self._pending.append(entry)
+        task.add_done_callback(self.tasks.discard)
+        task.add_done_callback(lambda _: self._pending.remove(entry))
+        return task
+
+    async def _handle(self, function_call_id, function_name, parameters, previous, depends_on, filler_timer=None):
+        try:
+            start_time = time.time()
+            if function_name in WEBSOCKET_FUNCTIONS:
+                result = await self._execute_after(depends_on, function_name, parameters)
+            else:
+                result = await self.single_flight.do(
+                    function_name,
+                    parameters,
+                    lambda: self._execute_after(depends_on, function_name, parameters),
+                )
+
+            # Responses go out in arrival order, merged calls included
+            if previous is not None:
+                await asyncio.wait({previous})
+            if filler_timer:
+                filler_timer.cancel()
+            if self.timeline:
+                self.timeline.mark("function_done")
+
+            inject_message = None
+            if function_name in WEBSOCKET_FUNCTIONS and "function_response" in result:
+                inject_message = result.get("inject_message")
+                result = result["function_response"]
+            else:
+                execution_time = time.time() - start_time
+                self.logger.info(f"Function Execution Latency: {execution_time:.3f}s")
+
+            if self.before_response:
+                await self.before_response(function_name, result)
+            await self.send_response(function_call_id, result)
+
+            # Filler messages are injected only after their function response
+            if inject_message and self.inject:
+                await self.inject(inject_message)
+            elif inject_message:
+                self.logger.info(f"Sending InjectAgentMessage: {json.dumps(inject_message)}")
+                await self.ws.send(json.dumps(inject_message))
+        except Exception as e:
+            self.logger.error(f"Error dispatching {function_name}: {e}")
+        finally:
+            if filler_timer:
+                filler_timer.cancel()
+
+    async def _execute_after(self, depends_on, function_name, parameters):
+        """Execute once every conflicting earlier call has finished."""
+        if depends_on:
+            await asyncio.wait(depends_on)
+        if self._executing:
+            self.stats["overlapped"] += 1
+        self._executing += 1
+        try:
+            return await self.execute(function_name, parameters)
+        finally:
+            self._executing -= 1
+
+    async def execute(self, function_name, parameters):
+        """Run one function within its timeout and return its result or an error dict."""
+        func = self.function_map.get(function_name)
+        if not func:
+            self.logger.error(f"Error executing function: Function {function_name} not found")
+            return {"error": f"Function {function_name} not found"}
+
+        # Malformed parameters get an error the agent can correct in one retry
+        validate = self.validators.get(function_name)
+        errors = validate(parameters) if validate else []
+        if errors:
+            self.logger.error(f"Invalid parameters for {function_name}: {errors}")
+            METRICS.inc("voice_agent_invalid_function_calls_total", function=function_name)
+            return {
+                "error": f"Invalid parameters for {function_name}: {'; '.join(errors)}. "
+                f"Correct them and call {function_name} again."
+            }
+
+        # A circuit breaker fails fast on a struggling function; reads may be
+        # answered with their last good result, marked stale (common.resilience)
+        guarded = function_name not in WEBSOCKET_FUNCTIONS
+        if guarded and not self.guard.allow(function_name):
+            self.logger.error(f"Circuit open for {function_name}; not calling it")
+            return self.guard.stale_result(function_name, parameters) or {
+                "error": f"{function_name} is temporarily unavailable, please try again in a moment"
+            }
+
+        timeout = self.timeouts.get(function_name, self.timeouts["default"])
+        span = None
+        if self.tracer:
+            span = self.tracer.start_span(
+                "function.call",
+                **{
+                    "function.name": function_name,
+                    "function.mode": self.modes.get(function_name, "async"),
+                    "function.parameters": self.tracer.truncate(parameters),
+                },
+            )
+        start_time = time.time()
+        work = asyncio.ensure_future(self._invoke(function_name, func, parameters))
+        is_write = function_name in WRITE_FUNCTIONS
+        try:
+            # A timed-out write keeps running: a pool worker cannot be stopped,
+            # and an async write cut off halfway is worse than one that finishes
+            result, queue_wait = await asyncio.wait_for(asyncio.shield(work) if is_write else work, timeout)
+            elapsed = time.time() - start_time
+            FUNCTION_LATENCY.record(function_name, elapsed, queue_wait)
+            METRICS.observe("voice_agent_function_seconds", elapsed, function=function_name)
+            if guarded:
+                self.guard.record_success(function_name, parameters, result)
+        except asyncio.TimeoutError:
+            FUNCTION_LATENCY.record(function_name, time.time() - start_time, failed=True)
+            self.logger.error(f"Function {function_name} timed out after {timeout}s")
+            result = {"error": f"{function_name} took too long to respond, please try again"}
+            if guarded:
+                self.guard.record_failure(function_name, timed_out=True)
+                result = self.guard.stale_result(function_name, parameters) or result
+            if is_write:
+                # Retrying would write twice, so the agent is told to wait instead
+                result = {
+                    "status": "processing",
+                    "message": f"{function_name} is still being processed. Do not call it again; "
+                    "tell the customer their request has been received and will be confirmed shortly.",
+                }
+                late = asyncio.ensure_future(self._finish_late_write(function_name, work, start_time))
+                self.single_flight.hold(function_name, parameters, late, result)
+        except Exception as e:
+            FUNCTION_LATENCY.record(function_name, time.time() - start_time, failed=True)
+            self.logger.error(f"Error executing function: {str(e)}")
+            result = {"error": str(e)}
+            if guarded:
+                self.guard.record_failure(function_name)
+                result = self.guard.stale_result(function_name, parameters) or result
+
+        if span is not None:
+            self.tracer.end_span(
+                span,
+                **{
+                    "function.payload_bytes": len(json.dumps(result, default=str)),
+                    "function.error": isinstance(result, dict) and "error" in result,
+                },
+            )
+        return result
+
+    async def _finish_late_write(self, function_name, work, start_time):
+        """Wait for a write that outlived its deadline and log how it ended."""
+        try:
+            result, _ = await work
+        except Exception as e:
+            self.logger.error(f"{function_name} failed after its deadline: {e}")
+            raise
+        self.logger.info(f"{function_name} completed after its deadline, in {time.time() - start_time:.3f}s")
+        return result
+
+    async def _invoke(self, function_name, func, parameters):
+        """Call func according to its execution mode and return (result, pool queue wait)."""
+        if function_name in WEBSOCKET_FUNCTIONS:
+            return await func(self.ws, parameters), 0.0
+
+        mode = self.modes.get(function_name, "async")
+        if mode == "async":
+            return await func(parameters), 0.0
+        # "blocking_io" and "cpu_bound" functions never block the event loop
+        return await run_in_pool(mode, func, parameters)
+
+    async def send_response(self, function_call_id, result):
+        response = {
+            "type": "FunctionCallResponse",
+            "function_call_id": function_call_id,
+            "output": json.dumps(result),
+        }
+        await self.ws.send(json.dumps(response))
+        self.last_response_time = time.time()
+        if self.timeline:
+            self.timeline.mark("function_response_sent")
+        self.logger.info(f"Function response sent: {json.dumps(result)}")
+
+    async def drain(self):
+        """Wait until every submitted call has sent its response."""
+        while self.tasks:
+            await asyncio.wait(set(self.tasks))
+
+    def cancel(self):
+        for task in list(self.tasks):
+            task.cancel()
@@ -1,16 +1,65 @@
 import logging
-import json
+import queue
+import re
+import time
 from datetime import datetime
-from flask_socketio import SocketIO
+from logging.handlers import QueueHandler, QueueListener
+
+from common.config import LOG_CONFIG
+from common.ui_publisher import LOBBY, current_room
+
+# Cheap classification of log lines without parsing any JSON
+_SERVER_TYPE = re.compile(r'^Server: .*?"type"\s*:\s*"(\w+)"')
+_ROLE = re.compile(r'"role"\s*:\s*"(\w+)"')
+_FUNCTION_PHRASES = re.compile(r"function response|parameters|function call", re.IGNORECASE)
+_INJECT_PHRASE = re.compile(r"injectagentmessage", re.IGNORECASE)
+_LATENCY_PHRASES = re.compile(r"decision latency|function execution latency", re.IGNORECASE)
+
+_USER_TYPES = {"UserStartedSpeaking", "EndOfThought"}
+_AGENT_TYPES = {"AgentStartedSpeaking", "AgentAudioDone"}
+_FUNCTION_TYPES = {"FunctionCalling", "FunctionCallRequest"}
+
+
+def classify(message):
+    """Return the log category of a message: "user", "agent", "function", "latency" or "default"."""
+    match = _SERVER_TYPE.match(message)
+    if match:
+        message_type = match.group(1)
+        if message_type in _USER_TYPES:
+            return "user"
+        if message_type in _AGENT_TYPES:
+            return "agent"
+        if message_type in _FUNCTION_TYPES:
+            return "function"
+        if message_type == "ConversationText":
+            role = _ROLE.search(message)
+            if role and role.group(1) == "user":
+                return "user"
+            if role and role.group(1) == "assistant":
+                return "agent"
+        return "default"
+
+    if message.startswith("Server:"):
+        return "default"
+    if _FUNCTION_PHRASES.search(message):
+        return "function"
+    if _INJECT_PHRASE.search(message):
+        return "agent"
+    if _LATENCY_PHRASES.search(message):
+        return "latency"
+    return "default"
 
 
 class CustomFormatter(
     logging.Formatter,
 ):
-    """Custom formatter to color-code log messages based on their content."""
+    """
+    Custom formatter to color-code log messages based on their content.
 
-    def __init__(self, socketio: SocketIO = None):
-        self.socketio = socketio
+    A record can name its category directly with extra={"category": ...};
+    otherwise the message is classified with precompiled patterns. One
+    formatter per colour is built up front.
+    """
 
     # ANSI escape codes for colors - using accessible palette
     COLORS = {
@@ -22,74 +71,122 @@ class CustomFormatter(
         "YELLOW": "\033[38;5;186m",  # Latency info
     }
 
+    CATEGORY_COLORS = {
+        "default": "WHITE",
+        "user": "BLUE",
+        "agent": "GREEN",
+        "function": "VIOLET",
+        "latency": "YELLOW",
+    }
+
+    FORMAT = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
+
+    def __init__(self):
+        super().__init__(self.FORMAT, datefmt="%H:%M:%S")
+        self._formatters = {
+            category: logging.Formatter(
+                self.COLORS[color] + self.FORMAT + self.COLORS["RESET"], datefmt="%H:%M:%S"
+            )
+            for category, color in self.CATEGORY_COLORS.items()
+        }
+
     def format(self, record):
-        # Default format string
-        format_str = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
-
-        # Default to white
-        color = self.COLORS["WHITE"]
-
-        msg = str(record.msg).lower()
-
-        # Check for JSON content
-        if "server:" in msg and "{" in msg:
-            try:
-                # Extract the JSON part
-                json_str = msg[msg.find("{") : msg.rfind("}") + 1]
-                data = json.loads(json_str)
-
-                # User/STT related messages
-                if data.get("type") in ["userstartedspeaking", "endofthought"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "user"
-                ):
-                    color = self.COLORS["BLUE"]
-
-                # Agent speaking/TTS related messages
-                elif data.get("type") in ["agentstartedspeaking", "agentaudiodone"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "assistant"
-                ):
-                    color = self.COLORS["GREEN"]
-
-                # Agent thinking/function calling
-                elif data.get("type") in ["functioncalling", "functioncallrequest"]:
-                    color = self.COLORS["VIOLET"]
-
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Non-JSON messages
-        else:
-            if any(
-                phrase in msg
-                for phrase in ["function response", "parameters", "function call"]
-            ):
-                color = self.COLORS["VIOLET"]
-            elif "injectagentmessage" in msg:
-                color = self.COLORS["GREEN"]
-            elif any(
-                phrase in msg
-                for phrase in ["decision latency", "function execution latency"]
-            ):
-                color = self.COLORS["YELLOW"]
-
-        # Apply the color to the format string
-        formatter = logging.Formatter(
-            color + format_str + self.COLORS["RESET"], datefmt="%H:%M:%S"
-        )
-        formatted_message = formatter.format(record)
-        # Emit the log message to the client with timestamp
-        if self.socketio:
-            try:
-                self.socketio.emit(
-                    "log_message",
+        category = getattr(record, "category", None)
+        if category not in self._formatters:
+            # Cached on the record so the console and browser handlers classify it once
+            category = record.category = classify(record.getMessage())
+        return self._formatters[category].format(record)
+
+
+class UILogHandler(logging.Handler):
+    """
+    Publishes formatted log lines to the browser through the UIPublisher.
+
+    Each line goes to the session room its record was logged from. At most
+    max_records_per_sec lines are forwarded; the rest are counted and
+    reported as a single dropped-lines notice.
+    """
+
+    def __init__(self, publisher, config=LOG_CONFIG):
+        super().__init__()
+        self.publisher = publisher
+        self.config = config
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.dropped = 0
+
+    def emit(self, record):
+        room = getattr(record, "room", LOBBY)
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            if self.dropped:
+                self.publisher.publish(
+                    room,
+                    "log",
                     {
-                        "message": formatted_message,
+                        "message": f"... {self.dropped} log lines dropped (rate limited)",
                         "timestamp": datetime.now().isoformat(),
                     },
                 )
-            except Exception as e:
-                print(f"Error emitting log message: {e}")
+                self.dropped = 0
+            self._window_start = now
+            self._window_count = 0
+        if self._window_count >= self.config["max_records_per_sec"]:
+            self.dropped += 1
+            return
+        self._window_count += 1
+        try:
+            message = {
+                "message": self.format(record),
+                "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            }
+        except Exception:
+            self.handleError(record)
+            return
+        self.publisher.publish(room, "log", message)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def prepare(self, record):
+        # Capture the session room here; the listener thread runs outside its context
+        record.room = current_room.get()
+        # Merge args into the message without formatting it; the listener does that
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging(logger, publisher=None, config=LOG_CONFIG):
+    """
+    Route logger through a queue so callers only enqueue records.
+
+    Formatting, console output and publishing to the browser happen on a
+    background QueueListener thread. Returns the started listener; stop() it
+    on exit.
+    """
+    formatter = CustomFormatter()
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+    if publisher is not None:
+        ui_handler = UILogHandler(publisher, config)
+        ui_handler.setFormatter(formatter)
+        handlers.append(ui_handler)
 
-        return formatted_message
+    log_queue = queue.Queue(config["queue_size"])
+    logger.addHandler(_DroppingQueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
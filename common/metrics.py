@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import deque
+
+from common.config import METRICS_CONFIG
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySummary:
+    """Count, sum and a sliding window of recent observations for quantile estimates."""
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self):
+        """Return {q: value} over the recent window using nearest rank."""
+        values = sorted(self.recent)
+        if not values:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency summaries and counters, rendered in the Prometheus
+    text exposition format for the /metrics endpoint.
+    """
+
+    def __init__(self, config=METRICS_CONFIG):
+        self.config = config
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._counters = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = LatencySummary(self.config["window"])
+            summary.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, collector):
+        """
+        Register a callable returning extra samples at render time as
+        (name, type, help, [(labels dict, value), ...]) tuples.
+        """
+        self._collectors.append(collector)
+
+    def quantiles(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            return summary.quantiles() if summary else None
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            summaries = sorted(self._summaries.items())
+            counters = sorted(self._counters.items())
+
+        seen = set()
+        for (name, labels), summary in summaries:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} summary")
+            for q, value in summary.quantiles().items():
+                lines.append(f"{name}{_labels(labels + (('quantile', q),))} {value:.6f}")
+            lines.append(f"{name}_sum{_labels(labels)} {summary.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {summary.count}")
+
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("voice_agent_turn_stage_seconds", "Latency of each stage of a conversational turn")
+METRICS.describe("voice_agent_function_seconds", "Agent function execution time")
+
+# Stage name -> (start mark, end mark) measured for every turn
+TURN_STAGES = {
+    "llm_decision": ("user_stopped_speaking", "function_calling"),
+    "request_delivery": ("function_calling", "function_request_received"),
+    "function_execution": ("function_request_received", "function_done"),
+    "response_send": ("function_done", "function_response_sent"),
+    "response_to_first_audio": ("function_response_sent", "first_agent_audio"),
+    "user_to_first_audio": ("user_stopped_speaking", "first_agent_audio"),
+    "agent_speech": ("first_agent_audio", "agent_audio_done"),
+}
+
+
+class TurnTimeline:
+    """
+    Monotonic timestamps for the events of one turn, from the user finishing
+    speaking to the agent's audio finishing. The first occurrence of each mark
+    is kept, except agent_audio_done which tracks the last. The turn's stage
+    latencies are recorded in METRICS when the next turn starts or the call
+    ends.
+    """
+
+    def __init__(self, registry=METRICS):
+        self.registry = registry
+        self.marks = {}
+
+    def mark(self, event):
+        if event == "agent_audio_done" or event not in self.marks:
+            self.marks[event] = time.monotonic()
+
+    def has(self, event):
+        return event in self.marks
+
+    def finish(self):
+        """Record this turn's stage latencies, start a new turn and return (marks, stages)."""
+        marks, stages = self.marks, {}
+        for stage, (start, end) in TURN_STAGES.items():
+            if start in marks and end in marks:
+                duration = marks[end] - marks[start]
+                if duration >= 0:
+                    stages[stage] = duration
+                    self.registry.observe("voice_agent_turn_stage_seconds", duration, stage=stage)
+        self.marks = {}
+        return marks, stages
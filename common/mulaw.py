@@ -0,0 +1,55 @@
+import numpy as np
+
+from common.websocket_wrapper import WebSocketWrapper
+
+# G.711 mu-law constants (the encoder works on 14-bit magnitudes, as in the reference implementation)
+BIAS = 0x84
+CLIP = 8159
+
+
+def _build_encode_table():
+    """uint8 mu-law code for every 16-bit sample, indexed by the sample's bits as a uint16."""
+    samples = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), CLIP) + (BIAS >> 2)
+    segment = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    code = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    # Magnitudes past the last segment take the largest code
+    code = np.where(segment > 7, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_decode_table():
+    """16-bit sample for every mu-law code."""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = ((((codes & 0x0F) << 3) + BIAS) << exponent) - BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+ENCODE_TABLE = _build_encode_table()
+DECODE_TABLE = _build_decode_table()
+
+
+def encode(pcm):
+    """16-bit PCM bytes to 8-bit mu-law bytes."""
+    return ENCODE_TABLE[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+
+
+def decode(data):
+    """8-bit mu-law bytes to 16-bit PCM bytes."""
+    return DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+class MulawWebSocket(WebSocketWrapper):
+    """
+    Wraps the agent websocket when SETTINGS negotiate "mulaw" audio: the
+    rest of the client keeps sending and receiving 16-bit PCM, while the
+    connection carries half the bytes. Text messages pass through unchanged.
+    """
+
+    def on_send(self, message):
+        return encode(message) if isinstance(message, bytes) else message
+
+    def on_receive(self, message):
+        return decode(message) if isinstance(message, bytes) else message
@@ -0,0 +1,46 @@
+import asyncio
+
+from common.config import PACING_CONFIG
+
+
+class TurnPacer:
+    """
+    Decides how long the receiver pauses at turn boundaries.
+
+    In "fixed" mode every pause is the configured fixed delay. In "event" mode
+    the pause is the playback time still queued in the Speaker plus an optional
+    naturalness delay, so no dead air is added once the audio has played. Both
+    the time actually waited and the time the fixed sleeps would have cost are
+    recorded so the reduction in turn latency can be reported.
+    """
+
+    def __init__(self, config=PACING_CONFIG):
+        self.config = config
+        self.stats = {
+            kind: {"count": 0, "waited": 0.0, "fixed": 0.0}
+            for kind in config["fixed_delays"]
+        }
+
+    def delay_for(self, kind, remaining_playback_secs=0.0):
+        if self.config["mode"] == "fixed":
+            return self.config["fixed_delays"][kind]
+        return max(0.0, remaining_playback_secs) + self.config["naturalness_delays"][kind]
+
+    async def pause(self, kind, remaining_playback_secs=0.0):
+        """Sleep for the pause appropriate to kind and return the seconds waited."""
+        delay = self.delay_for(kind, remaining_playback_secs)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        stats = self.stats[kind]
+        stats["count"] += 1
+        stats["waited"] += delay
+        stats["fixed"] += self.config["fixed_delays"][kind]
+        return delay
+
+    def summary(self):
+        """Return (seconds waited, seconds the fixed sleeps would have taken, pauses)."""
+        waited = sum(s["waited"] for s in self.stats.values())
+        fixed = sum(s["fixed"] for s in self.stats.values())
+        count = sum(s["count"] for s in self.stats.values())
+        return waited, fixed, count
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+
+from common.config import PHRASE_CACHE_CONFIG
+from common.executors import get_thread_pool
+from common.metrics import METRICS
+from common.tracing import message_type
+from common.websocket_wrapper import WebSocketWrapper
+
+_NOT_WORDS = re.compile(r"[^a-z0-9]+")
+
+METRICS.describe("voice_agent_phrase_cache_total", "Injected agent phrases played from the phrase cache (hit) or spoken by the agent (miss)")
+
+
+def normalize(text):
+    """Compare phrases by their words only ("Let me look that up for you..." == "let me look that up for you.")."""
+    return _NOT_WORDS.sub(" ", text.lower()).strip()
+
+
+class PhraseCache:
+    """
+    Agent audio for fixed injected phrases (fillers and farewells), kept in
+    memory and on disk so later calls can play them without a TTS round trip.
+
+    Audio is 16-bit PCM at the agent sample rate and is stored per voice:
+    entries for any other voice or sample rate are deleted when the cache is
+    first used, so changing VOICE invalidates it. Disk writes run on the
+    shared thread pool.
+    """
+
+    def __init__(self, voice, sample_rate, config=PHRASE_CACHE_CONFIG):
+        self.config = config
+        self.sample_rate = sample_rate
+        self.directory = os.path.join(config["directory"], f"{voice}_{sample_rate}")
+        self._lock = threading.Lock()
+        self._audio = None
+
+    @property
+    def enabled(self):
+        return self.config["enabled"]
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()[:16]
+
+    def _entries(self):
+        with self._lock:
+            if self._audio is None:
+                self._audio = self._load()
+            return self._audio
+
+    def _load(self):
+        root = self.config["directory"]
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if path != self.directory and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+        audio = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".pcm"):
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    audio[name[: -len(".pcm")]] = f.read()
+        return audio
+
+    def get(self, text):
+        if not self.enabled:
+            return None
+        return self._entries().get(self.key(text))
+
+    def store(self, text, audio):
+        if len(audio) < 2 * self.sample_rate * self.config["min_audio_secs"]:
+            return False
+        key = self.key(text)
+        self._entries()[key] = audio
+        get_thread_pool().submit(self._write, key, audio)
+        return True
+
+    def _write(self, key, audio):
+        path = os.path.join(self.directory, f"{key}.pcm")
+        with open(path + ".tmp", "wb") as f:
+            f.write(audio)
+        os.replace(path + ".tmp", path)
+
+
+class PhraseCaptureWebSocket(WebSocketWrapper):
+    """
+    Wraps the agent websocket and captures the audio the agent speaks for
+    each InjectAgentMessage sent through it, storing it in the PhraseCache
+    once AgentAudioDone arrives. Capture starts at the ConversationText
+    matching the injected phrase (or AgentStartedSpeaking) and is abandoned
+    if the agent says something else or the caller barges in.
+    """
+
+    def __init__(self, ws, cache, logger):
+        super().__init__(ws)
+        self.cache = cache
+        self.logger = logger
+        self._pending = None
+        self._capturing = None
+        self._audio = []
+        # The agent announced other speech, so the next audio is not the phrase
+        self._other_speech = False
+
+    def on_send(self, message):
+        if isinstance(message, str) and message_type(message) == "InjectAgentMessage":
+            phrase = json.loads(message).get("message")
+            if phrase and self.cache.get(phrase) is None:
+                self._pending = phrase
+        return message
+
+    def _start(self):
+        self._capturing, self._pending, self._audio = self._pending, None, []
+
+    def on_receive(self, message):
+        self._observe(message)
+        return message
+
+    def _observe(self, message):
+        if isinstance(message, bytes):
+            if self._capturing:
+                self._audio.append(message)
+            return
+        received_type = message_type(message)
+        if received_type == "ConversationText":
+            data = json.loads(message)
+            if data.get("role") != "assistant":
+                return
+            if self._pending and normalize(data.get("content", "")) == normalize(self._pending):
+                self._start()
+            elif self._capturing and normalize(data.get("content", "")) != normalize(self._capturing):
+                self._capturing = None
+            else:
+                self._other_speech = True
+        elif received_type == "AgentStartedSpeaking":
+            if self._pending and not self._other_speech:
+                self._start()
+        elif received_type == "AgentAudioDone":
+            if self._capturing and self.cache.store(self._capturing, b"".join(self._audio)):
+                self.logger.info(f"Cached agent audio for: {self._capturing}")
+            self._capturing, self._audio, self._other_speech = None, [], False
+        elif received_type == "UserStartedSpeaking":
+            self._pending = self._capturing = None
+            self._audio = []
@@ -0,0 +1,201 @@
+import threading
+import time
+
+import numpy as np
+
+from common.config import PLAYBACK_CONFIG
+from common.metrics import METRICS
+
+
+class PcmRingBuffer:
+    """Preallocated single-producer / single-consumer ring buffer of int16 samples."""
+
+    def __init__(self, capacity):
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._read = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def write(self, samples):
+        """Append samples and return how many fit; the rest are dropped."""
+        with self._lock:
+            count = min(len(samples), self._capacity - self._size)
+            start = (self._read + self._size) % self._capacity
+            first = min(count, self._capacity - start)
+            self._buffer[start : start + first] = samples[:first]
+            self._buffer[: count - first] = samples[first:count]
+            self._size += count
+            return count
+
+    def read_into(self, out):
+        """Copy up to len(out) samples into out and return how many were copied."""
+        with self._lock:
+            count = min(len(out), self._size)
+            first = min(count, self._capacity - self._read)
+            out[:first] = self._buffer[self._read : self._read + first]
+            out[first:count] = self._buffer[: count - first]
+            self._read = (self._read + count) % self._capacity
+            self._size -= count
+            return count
+
+    def clear(self):
+        """Drop everything buffered and return the number of samples dropped."""
+        with self._lock:
+            dropped = self._size
+            self._read = 0
+            self._size = 0
+            return dropped
+
+
+class PlaybackEngine:
+    """
+    Jitter-buffered playback of agent PCM in fixed-size output blocks.
+
+    Websocket audio is written into a ring buffer from the event loop and the
+    audio device (or any other clock) pulls one block at a time with
+    fill_block(). Playback starts once the jitter target is buffered, or when
+    the agent reports the end of its audio, and flush() discards everything so
+    the next block pulled is silence.
+    """
+
+    def __init__(self, sample_rate, config=PLAYBACK_CONFIG):
+        self.sample_rate = sample_rate
+        self.block_samples = int(sample_rate * config["block_ms"] / 1000)
+        self.jitter_target_samples = int(sample_rate * config["jitter_target_ms"] / 1000)
+        self.max_prebuffer_secs = 2 * config["jitter_target_ms"] / 1000
+        self.ring = PcmRingBuffer(int(sample_rate * config["capacity_secs"]))
+
+        self._odd_byte = b""
+        self._playing = False
+        self._end_of_stream = False
+        self._buffering_since = None
+
+        self.stats = {
+            "blocks_played": 0,
+            "samples_played": 0,
+            "underruns": 0,
+            "flushes": 0,
+            "samples_flushed": 0,
+            "samples_dropped": 0,
+        }
+
+    def write(self, data):
+        """Queue a chunk of little-endian 16-bit PCM for playback."""
+        data = self._odd_byte + data
+        if len(data) % 2:
+            self._odd_byte, data = data[-1:], data[:-1]
+        else:
+            self._odd_byte = b""
+
+        samples = np.frombuffer(data, dtype=np.int16)
+        written = self.ring.write(samples)
+        self.stats["samples_dropped"] += len(samples) - written
+        self._end_of_stream = False
+        if self._buffering_since is None:
+            self._buffering_since = time.monotonic()
+
+    def end_of_stream(self):
+        """Mark the current utterance complete so its tail plays without waiting for the jitter target."""
+        self._end_of_stream = True
+
+    def flush(self):
+        """Barge-in: drop all queued audio so output is silent from the next block on."""
+        dropped = self.ring.clear()
+        self._odd_byte = b""
+        self._playing = False
+        self._buffering_since = None
+        self.stats["flushes"] += 1
+        self.stats["samples_flushed"] += dropped
+        return dropped
+
+    def buffered_samples(self):
+        return len(self.ring)
+
+    def buffered_seconds(self):
+        return len(self.ring) / self.sample_rate
+
+    def fill_block(self, out):
+        """Fill one output block (an int16 array) with audio or silence."""
+        if not self._playing:
+            buffered = len(self.ring)
+            waited = (
+                self._buffering_since is not None
+                and time.monotonic() - self._buffering_since >= self.max_prebuffer_secs
+            )
+            if buffered and (buffered >= self.jitter_target_samples or self._end_of_stream or waited):
+                self._playing = True
+            else:
+                out[:] = 0
+                return 0
+
+        count = self.ring.read_into(out)
+        out[count:] = 0
+        self.stats["blocks_played"] += 1
+        self.stats["samples_played"] += count
+
+        if count < len(out):
+            # Ran dry: unless the agent said it was done, this is an underrun
+            if not self._end_of_stream:
+                self.stats["underruns"] += 1
+            self._playing = False
+            self._buffering_since = None
+        return count
+
+
+class PlaybackSpeaker:
+    """
+    Base for speakers that play agent audio through a PlaybackEngine. A
+    subclass opens the engine with open_engine() when its output starts,
+    pulls blocks from it, and calls close_engine() when the output stops.
+    """
+
+    def __init__(self, sample_rate, logger):
+        self.sample_rate = sample_rate
+        self.logger = logger
+        self._engine = None
+
+    def open_engine(self):
+        self._engine = PlaybackEngine(self.sample_rate)
+        return self._engine
+
+    def close_engine(self):
+        stats = self._engine.stats
+        METRICS.inc("voice_agent_playback_underruns_total", stats["underruns"])
+        METRICS.inc("voice_agent_playback_flushes_total", stats["flushes"])
+        self.logger.info(
+            f"Playback: {stats['blocks_played']} blocks played, {stats['underruns']} underruns, "
+            f"{stats['flushes']} barge-in flushes"
+        )
+        self._engine = None
+
+    async def play(self, data):
+        if self._engine:
+            self._engine.write(data)
+
+    def audio_done(self):
+        """The agent finished sending audio for this utterance."""
+        if self._engine:
+            self._engine.end_of_stream()
+
+    def output_latency_secs(self):
+        """Audio already handed to the output but not yet heard."""
+        return 0.0
+
+    def remaining_playback_secs(self):
+        """Seconds of agent audio still queued, including the output latency."""
+        if not self._engine:
+            return 0.0
+        return self._engine.buffered_samples() / self.sample_rate + self.output_latency_secs()
+
+    def stop(self):
+        """Barge-in: silence output within one block."""
+        if self._engine:
+            self._engine.flush()
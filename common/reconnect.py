@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+
+from common.config import RECONNECT_CONFIG
+from common.metrics import METRICS
+from common.tracing import message_type
+from common.websocket_wrapper import WebSocketWrapper
+
+METRICS.describe("voice_agent_reconnect_seconds", "Time from an agent websocket drop to the resumed session")
+
+
+class ReconnectingWebSocket(WebSocketWrapper):
+    """
+    Wraps the agent websocket and resumes the session on a new connection
+    when it drops with an error, so the call carries on instead of ending.
+
+    connect(context) opens a configured connection whose settings carry the
+    given context: the conversation so far, taken from ConversationText
+    events, with replay set when the agent was cut off mid-reply so it says
+    it again. Microphone audio sent during the gap is buffered and flushed
+    to the new connection; other client messages belong to the old session
+    and are dropped. A normal close, from either side, still ends the call.
+    """
+
+    def __init__(self, ws, connect, logger, audio_bytes_per_sec, config=RECONNECT_CONFIG):
+        super().__init__(ws)
+        self._connect = connect
+        self.logger = logger
+        self.config = config
+        self._max_buffered_bytes = int(config["max_buffered_audio_secs"] * audio_bytes_per_sec)
+        self._buffer = deque()
+        self._buffered_bytes = 0
+        self._reconnecting = None
+        self._failed = None
+        self._closing = False
+        self._agent_replying = False
+        self.history = []
+        self.stats = {"drops": 0, "reconnects": 0, "audio_bytes_buffered": 0, "audio_bytes_dropped": 0}
+
+    def on_receive(self, message):
+        """Follow the conversation so a new connection can be given its context."""
+        if isinstance(message, bytes):
+            return message
+        received_type = message_type(message)
+        if received_type == "ConversationText":
+            data = json.loads(message)
+            entry = {"role": data.get("role"), "content": data.get("content")}
+            # A replayed reply is reported again; keep it once
+            if not self.history or self.history[-1] != entry:
+                self.history.append(entry)
+                del self.history[: -self.config["max_history_messages"]]
+            self._agent_replying = entry["role"] == "assistant"
+        elif received_type in ("AgentAudioDone", "UserStartedSpeaking"):
+            self._agent_replying = False
+        return message
+
+    def _start_reconnect(self, error):
+        if self._reconnecting is None:
+            self.stats["drops"] += 1
+            self.logger.warning(f"Agent connection dropped ({error}); reconnecting")
+            self._reconnecting = asyncio.create_task(self._reconnect(error))
+        return self._reconnecting
+
+    async def _reconnect(self, error):
+        started = time.monotonic()
+        context = {"messages": list(self.history), "replay": self._agent_replying} if self.history else None
+        delay = self.config["initial_backoff_secs"]
+        for attempt in range(1, self.config["max_attempts"] + 1):
+            try:
+                ws = await self._connect(context)
+                break
+            except Exception as e:
+                self.logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+                if attempt == self.config["max_attempts"]:
+                    self._failed = error
+                    raise error
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.config["max_backoff_secs"])
+
+        old, self._ws = self._ws, ws
+        # Audio sent while this flushes is queued behind it, so order is kept
+        while self._buffer:
+            await ws.send(self._buffer.popleft())
+        self._buffered_bytes = 0
+        self._reconnecting = None
+
+        elapsed = time.monotonic() - started
+        self.stats["reconnects"] += 1
+        METRICS.observe("voice_agent_reconnect_seconds", elapsed)
+        self.logger.info(
+            f"Agent session resumed in {elapsed:.3f}s with {len(self.history)} messages of context"
+            f"{' (replaying the interrupted reply)' if context and context['replay'] else ''}"
+        )
+        try:
+            await asyncio.wait_for(old.close(), self.config["close_timeout_secs"])
+        except Exception:
+            pass
+
+    def _buffer_audio(self, data):
+        self._buffer.append(data)
+        self._buffered_bytes += len(data)
+        self.stats["audio_bytes_buffered"] += len(data)
+        while self._buffered_bytes > self._max_buffered_bytes and len(self._buffer) > 1:
+            dropped = self._buffer.popleft()
+            self._buffered_bytes -= len(dropped)
+            self.stats["audio_bytes_dropped"] += len(dropped)
+
+    async def send(self, message):
+        if self._failed:
+            raise self._failed
+        if self._reconnecting is None:
+            try:
+                return await self._ws.send(message)
+            except ConnectionClosedError as e:
+                if self._closing:
+                    raise
+                self._start_reconnect(e)
+
+        if isinstance(message, bytes):
+            self._buffer_audio(message)
+        else:
+            self.logger.warning(f"Dropped {message_type(message)} sent while reconnecting")
+
+    async def recv(self):
+        while True:
+            if self._reconnecting:
+                await self._reconnecting
+            try:
+                message = await self._ws.recv()
+            except ConnectionClosedError as e:
+                if self._closing:
+                    raise
+                await self._start_reconnect(e)
+                continue
+            return self.on_receive(message)
+
+    async def __aiter__(self):
+        while True:
+            try:
+                message = await self.recv()
+            except ConnectionClosedOK:
+                return
+            yield message
+
+    async def close(self, *args, **kwargs):
+        self._closing = True
+        if self._reconnecting:
+            self._reconnecting.cancel()
+        return await self._ws.close(*args, **kwargs)
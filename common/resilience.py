@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from common.agent_functions import STALE_SAFE_FUNCTIONS
+from common.config import RESILIENCE_CONFIG
+from common.metrics import METRICS
+from common.single_flight import call_key
+
+METRICS.describe("voice_agent_function_timeouts_total", "Agent function calls that missed their deadline")
+METRICS.describe("voice_agent_stale_responses_total", "Failed agent function calls answered with the last good result")
+METRICS.describe("voice_agent_circuit_rejections_total", "Agent function calls refused without running because the breaker was open")
+
+# Breaker states, exported as a gauge
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures (timeouts or
+    exceptions), so calls fail fast instead of each waiting out the
+    deadline. After reset_timeout_secs one trial call is let through:
+    success closes the breaker, failure opens it again. A trial that never
+    reports back (e.g. cancelled with its call) is replaced by another after
+    reset_timeout_secs.
+    """
+
+    def __init__(self, config=RESILIENCE_CONFIG):
+        self.config = config
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def allow(self):
+        now = time.monotonic()
+        reset = self.config["reset_timeout_secs"]
+        if self.state == OPEN and now - self.opened_at >= reset:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and (self._trial_started is None or now - self._trial_started >= reset):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_started = None
+        if self.state == HALF_OPEN or self.failures >= self.config["failure_threshold"]:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class FunctionGuard:
+    """
+    Process-wide circuit breakers for agent functions, and the last good
+    result of each read in STALE_SAFE_FUNCTIONS.
+
+    When a call times out, raises or is refused by an open breaker, a read
+    whose last good result (for the same parameters) is at most
+    max_stale_secs old is answered with that result marked "stale", so the
+    agent can still help while telling the caller the data may be out of
+    date. Writes and other functions never get a stale answer.
+    """
+
+    def __init__(self, stale_safe=STALE_SAFE_FUNCTIONS, config=RESILIENCE_CONFIG):
+        self.stale_safe = stale_safe
+        self.config = config
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._results = OrderedDict()
+        METRICS.register_collector(self._samples)
+
+    def _breaker(self, function_name):
+        breaker = self._breakers.get(function_name)
+        if breaker is None:
+            breaker = self._breakers[function_name] = CircuitBreaker(self.config)
+        return breaker
+
+    def allow(self, function_name):
+        with self._lock:
+            allowed = self._breaker(function_name).allow()
+        if not allowed:
+            METRICS.inc("voice_agent_circuit_rejections_total", function=function_name)
+        return allowed
+
+    def record_success(self, function_name, parameters, result):
+        with self._lock:
+            self._breaker(function_name).record_success()
+            if function_name in self.stale_safe and not (isinstance(result, dict) and "error" in result):
+                key = call_key(function_name, parameters)
+                self._results[key] = (time.time(), result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.config["max_cached_results"]:
+                    self._results.popitem(last=False)
+
+    def record_failure(self, function_name, timed_out=False):
+        if timed_out:
+            METRICS.inc("voice_agent_function_timeouts_total", function=function_name)
+        with self._lock:
+            self._breaker(function_name).record_failure()
+
+    def stale_result(self, function_name, parameters):
+        """The last good result marked stale, or None when there is none that may be used."""
+        if function_name not in self.stale_safe:
+            return None
+        with self._lock:
+            cached = self._results.get(call_key(function_name, parameters))
+        if cached is None or time.time() - cached[0] > self.config["max_stale_secs"]:
+            return None
+        stored_at, result = cached
+        METRICS.inc("voice_agent_stale_responses_total", function=function_name)
+        marker = {"stale": True, "as_of": datetime.fromtimestamp(stored_at).isoformat(timespec="seconds")}
+        return {**result, **marker} if isinstance(result, dict) else {"result": result, **marker}
+
+    def _samples(self):
+        with self._lock:
+            states = [({"function": name}, STATE_VALUES[b.state]) for name, b in sorted(self._breakers.items())]
+        return [
+            (
+                "voice_agent_circuit_state",
+                "gauge",
+                "Agent function circuit breaker state (0 closed, 1 half open, 2 open)",
+                states,
+            )
+        ]
+
+
+FUNCTION_GUARD = FunctionGuard()
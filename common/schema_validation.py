@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from common.agent_functions import FUNCTION_DEFINITIONS
+from common.metrics import METRICS
+
+METRICS.describe("voice_agent_invalid_function_calls_total", "Function calls rejected before dispatch because their parameters did not match the schema")
+
+JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+def _is_date_time(value):
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+FORMATS = {"date-time": (_is_date_time, "an ISO date and time (YYYY-MM-DDTHH:MM:SS)")}
+
+
+def _compile_property(name, schema):
+    """A check returning (value, error) for one property: the value, converted where lossless, and an error or None."""
+    expected = JSON_TYPES.get(schema.get("type"))
+    enum = schema.get("enum")
+    format_check, format_description = FORMATS.get(schema.get("format"), (None, None))
+
+    def check(value):
+        # Tool-call JSON often writes integers as 30.0
+        if expected is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return value, error(value)
+
+    def error(value):
+        # bool is an int in Python but not in JSON
+        if expected and (not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool)):
+            return f"{name} must be {'an' if schema['type'][0] in 'aeiou' else 'a'} {schema['type']} (got {value!r})"
+        if enum and value not in enum:
+            return f"{name} must be one of {', '.join(map(repr, enum))} (got {value!r})"
+        if format_check and not format_check(value):
+            return f"{name} must be {format_description} (got {value!r})"
+        return None
+
+    return check
+
+
+def compile_validator(parameters_schema):
+    """
+    Compile a function's parameters schema into validate(params), which
+    returns a list of errors (empty when params are valid). Covers the
+    subset of JSON Schema used in FUNCTION_DEFINITIONS: required
+    properties, types, enums and the date-time format. Integral floats
+    given for integer properties are converted to int in params.
+    """
+    required = parameters_schema.get("required", [])
+    checks = {
+        name: _compile_property(name, schema) for name, schema in parameters_schema.get("properties", {}).items()
+    }
+
+    def validate(params):
+        if not isinstance(params, dict):
+            return [f"parameters must be an object (got {params!r})"]
+        errors = [f"{name} is required" for name in required if params.get(name) is None]
+        for name, value in params.items():
+            check = checks.get(name)
+            if check is not None and value is not None:
+                params[name], error = check(value)
+                if error:
+                    errors.append(error)
+        return errors
+
+    return validate
+
+
+def compile_validators(definitions=FUNCTION_DEFINITIONS):
+    return {definition["name"]: compile_validator(definition["parameters"]) for definition in definitions}
+
+
+# Validators for every agent function, compiled once at import
+VALIDATORS = compile_validators()
@@ -0,0 +1,102 @@
+import base64
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common.config import RECORDING_CONFIG
+from common.tracing import message_type
+from common.websocket_wrapper import WebSocketWrapper
+
+
+def recording_event(t, direction, message):
+    """One recorded websocket message: seconds since connect, "server" or "client", and its payload."""
+    event = {"t": round(t, 6), "direction": direction}
+    if isinstance(message, bytes):
+        event["audio"] = base64.b64encode(message).decode("ascii")
+    else:
+        event["type"] = message_type(message)
+        event["text"] = message
+    return event
+
+
+def load_recording(path):
+    """Read a recorded session as a list of events in order."""
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                event = json.loads(line)
+                if "audio" in event:
+                    event["audio"] = base64.b64decode(event["audio"])
+                events.append(event)
+    return events
+
+
+class RecordingWebSocket(WebSocketWrapper):
+    """
+    Wraps the agent websocket and records the session to a JSONL file for
+    mock_agent_server.py to replay.
+
+    Every server message is recorded, including agent audio. Client text
+    messages are recorded so the replay can wait for the same function
+    responses and injected messages; client microphone audio is not.
+    Lines are written in order by a single background writer thread.
+
+    A socket may be wrapped after it was opened (e.g. taken from the
+    connection pool): connected_at (time.monotonic()) starts the clock at
+    the connection instead, and sent holds the messages already sent on
+    it, such as the settings, which are recorded first.
+    """
+
+    def __init__(self, ws, config=RECORDING_CONFIG, connected_at=None, sent=()):
+        super().__init__(ws)
+        self.config = config
+        os.makedirs(config["directory"], exist_ok=True)
+        self.path = os.path.join(
+            config["directory"], f"session_{time.strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}.jsonl"
+        )
+        self._file = open(self.path, "w")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-recorder")
+        self._start = time.monotonic() if connected_at is None else connected_at
+        self._pending = [recording_event(0.0, "client", message) for message in sent]
+        self._finished = False
+
+    def _record(self, direction, message):
+        self._pending.append(recording_event(time.monotonic() - self._start, direction, message))
+        if len(self._pending) >= self.config["flush_every"]:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self._writer.submit(self._write, batch)
+
+    def _write(self, batch):
+        self._file.write("".join(json.dumps(event) + "\n" for event in batch))
+        self._file.flush()
+
+    def on_send(self, message):
+        if not isinstance(message, bytes):
+            self._record("client", message)
+        return message
+
+    def on_receive(self, message):
+        self._record("server", message)
+        return message
+
+    async def close(self, *args, **kwargs):
+        try:
+            return await self._ws.close(*args, **kwargs)
+        finally:
+            self.finish()
+
+    def finish(self):
+        """Write everything still buffered and close the file."""
+        if self._finished:
+            return
+        self._finished = True
+        self._flush()
+        self._writer.submit(self._file.close)
+        self._writer.shutdown(wait=False)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+
+from common.config import SINGLE_FLIGHT_CONFIG
+
+
+def call_key(function_name, parameters):
+    """Canonical key for a call: the function name plus its parameters with sorted keys."""
+    return function_name + ":" + json.dumps(parameters, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SingleFlight:
+    """
+    Merges identical concurrent function calls into one execution.
+
+    Read-only calls with the same key share the in-flight result. Writes are
+    protected by an idempotency key instead: an identical write that arrives
+    while the first is running, or shortly after it succeeded, gets the
+    original result rather than booking or recording the same thing twice.
+    A write that outlived its deadline is held with hold() until its worker
+    finishes, so a retry meanwhile gets the interim result instead.
+    """
+
+    def __init__(self, write_functions, config=SINGLE_FLIGHT_CONFIG):
+        self.write_functions = write_functions
+        self.config = config
+        self._in_flight = {}
+        self._completed_writes = {}
+        self._held_writes = {}
+        self.stats = {"executed": 0, "merged": 0, "idempotent_replays": 0}
+
+    async def do(self, function_name, parameters, call):
+        """Run call() once per key; identical callers await the same result."""
+        if not self.config["enabled"]:
+            return await call()
+
+        key = call_key(function_name, parameters)
+        is_write = function_name in self.write_functions
+
+        if is_write:
+            if key in self._held_writes:
+                self.stats["idempotent_replays"] += 1
+                return self._held_writes[key]
+            now = time.monotonic()
+            window = self.config["idempotency_window_secs"]
+            self._completed_writes = {
+                k: v for k, v in self._completed_writes.items() if now - v[0] < window
+            }
+            if key in self._completed_writes:
+                self.stats["idempotent_replays"] += 1
+                return self._completed_writes[key][1]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats["idempotent_replays" if is_write else "merged"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.stats["executed"] += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+        future.set_result(result)
+        if is_write and key not in self._held_writes and not (isinstance(result, dict) and "error" in result):
+            self._completed_writes[key] = (time.monotonic(), result)
+        return result
+
+    def hold(self, function_name, parameters, work, interim_result):
+        """
+        Answer identical writes with interim_result until work (a task or
+        future still running the write) finishes. Its result is then kept
+        for the idempotency window as usual; if it failed, the write may be
+        retried.
+        """
+        key = call_key(function_name, parameters)
+        self._held_writes[key] = interim_result
+
+        def release(work):
+            del self._held_writes[key]
+            if work.cancelled() or work.exception() is not None:
+                return
+            result = work.result()
+            if not (isinstance(result, dict) and "error" in result):
+                self._completed_writes[key] = (time.monotonic(), result)
+
+        work.add_done_callback(release)
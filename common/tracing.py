@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from common.config import TRACE_CONFIG
+from common.executors import get_thread_pool
+from common.websocket_wrapper import WebSocketWrapper
+
+MESSAGE_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"([A-Za-z]+)"')
+
+_writer_lock = threading.Lock()
+_writers = {}
+
+
+def _trace_logger(config):
+    """Return a logger that appends lines to the rotating trace file."""
+    path = config["path"]
+    with _writer_lock:
+        trace_logger = _writers.get(path)
+        if trace_logger is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(
+                path, maxBytes=config["max_bytes"], backupCount=config["backup_count"]
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            trace_logger = logging.getLogger(f"voice_agent.trace.{path}")
+            trace_logger.propagate = False
+            trace_logger.setLevel(logging.INFO)
+            trace_logger.addHandler(handler)
+            _writers[path] = trace_logger
+        return trace_logger
+
+
+def message_type(message):
+    """Cheaply read the "type" field of a JSON text message without parsing it."""
+    match = MESSAGE_TYPE_PATTERN.search(message, 0, 200)
+    return match.group(1) if match else "unknown"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes", "events")
+
+    def __init__(self, name, parent_id, start, attributes):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+        self.events = []
+
+
+class CallTracer:
+    """
+    Span tree for one VoiceAgent session, written as compact JSONL.
+
+    Each line is one finished span in the shape of the OpenTelemetry JSON
+    exporter (name, context.trace_id/span_id, parent_id, unix-nanosecond
+    start and end times, flat attributes and events). Whole calls are
+    sampled in or out up front. Spans are buffered and appended to a rotating
+    file from the worker thread pool, so the event loop never does file I/O.
+    """
+
+    def __init__(self, config=TRACE_CONFIG):
+        self.config = config
+        self.sampled = config["enabled"] and random.random() < config["sample_rate"]
+        self.trace_id = os.urandom(16).hex()
+        # Offset to turn time.monotonic() marks into unix nanoseconds
+        self._mono_offset_ns = time.time_ns() - time.monotonic_ns()
+        self._pending = []
+        self.root = self.start_span("voice_agent.session", parent=None) if self.sampled else None
+
+    def start_span(self, name, parent=False, **attributes):
+        """Start a span; parent defaults to the session root."""
+        if not self.sampled:
+            return None
+        if parent is False:
+            parent = self.root
+        return Span(name, parent.span_id if parent else None, time.time_ns(), attributes)
+
+    def end_span(self, span, **attributes):
+        if span is None:
+            return
+        span.end = time.time_ns()
+        span.attributes.update(attributes)
+        self._pending.append(span)
+        if len(self._pending) >= self.config["flush_every"]:
+            self.flush()
+
+    def record_span(self, name, start_ns, end_ns, parent=False, **attributes):
+        """Record an already finished span from explicit unix-nanosecond timestamps."""
+        span = self.start_span(name, parent, **attributes)
+        if span is None:
+            return
+        span.start = start_ns
+        span.end = end_ns
+        self._pending.append(span)
+
+    def add_event(self, name, span=None, **attributes):
+        target = span or self.root
+        if target is not None:
+            target.events.append(
+                {"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes}
+            )
+
+    def monotonic_to_ns(self, mono):
+        return int(mono * 1e9) + self._mono_offset_ns
+
+    def record_turn(self, marks, stages):
+        """Record a finished turn (see metrics.TurnTimeline) as a span with per-stage latencies."""
+        if not self.sampled or not marks:
+            return
+        attributes = {f"stage.{stage}": round(seconds, 6) for stage, seconds in stages.items()}
+        attributes.update({f"mark.{event}": self.monotonic_to_ns(t) for event, t in marks.items()})
+        self.record_span(
+            "voice_agent.turn",
+            self.monotonic_to_ns(min(marks.values())),
+            self.monotonic_to_ns(max(marks.values())),
+            **attributes,
+        )
+
+    def truncate(self, value):
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        limit = self.config["max_parameter_chars"]
+        return text if len(text) <= limit else text[:limit] + "..."
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        lines = [self._to_json(span) for span in batch]
+        get_thread_pool().submit(self._write, lines)
+
+    def _write(self, lines):
+        trace_logger = _trace_logger(self.config)
+        for line in lines:
+            trace_logger.info(line)
+
+    def _to_json(self, span):
+        return json.dumps(
+            {
+                "name": span.name,
+                "context": {"trace_id": self.trace_id, "span_id": span.span_id},
+                "parent_id": span.parent_id,
+                "start_time_unix_nano": span.start,
+                "end_time_unix_nano": span.end,
+                "attributes": span.attributes,
+                "events": span.events,
+            },
+            separators=(",", ":"),
+            default=str,
+        )
+
+    def close(self, **attributes):
+        """End the session span and write everything still buffered."""
+        if self.root is not None:
+            root, self.root = self.root, None
+            self.end_span(root, **attributes)
+        self.flush()
+
+
+class TracedWebSocket(WebSocketWrapper):
+    """
+    Wraps the agent websocket so every message sent and received becomes a
+    span. A received message's span lasts until the receive loop asks for the
+    next message, so it covers the time spent handling it. Audio chunks are
+    only counted unless trace_audio_messages is enabled.
+    """
+
+    def __init__(self, ws, tracer):
+        super().__init__(ws)
+        self._tracer = tracer
+        self.audio_bytes_sent = 0
+        self.audio_bytes_received = 0
+        # Span of the message recv() last returned, still being handled
+        self._handling = None
+
+    async def send(self, message):
+        if isinstance(message, bytes):
+            self.audio_bytes_sent += len(message)
+            if not self._tracer.config["trace_audio_messages"]:
+                return await self._ws.send(message)
+            span = self._tracer.start_span("message.send", **{"message.type": "audio", "message.bytes": len(message)})
+        else:
+            span = self._tracer.start_span(
+                "message.send", **{"message.type": message_type(message), "message.bytes": len(message)}
+            )
+        try:
+            return await self._ws.send(message)
+        finally:
+            self._tracer.end_span(span)
+
+    def _receive_span(self, message):
+        if isinstance(message, bytes):
+            self.audio_bytes_received += len(message)
+            if not self._tracer.config["trace_audio_messages"]:
+                return None
+            return self._tracer.start_span(
+                "message.receive", **{"message.type": "audio", "message.bytes": len(message)}
+            )
+        return self._tracer.start_span(
+            "message.receive", **{"message.type": message_type(message), "message.bytes": len(message)}
+        )
+
+    def _end_handling(self):
+        span, self._handling = self._handling, None
+        self._tracer.end_span(span)
+
+    def on_receive(self, message):
+        self._handling = self._receive_span(message)
+        return message
+
+    async def recv(self):
+        # Asking for the next message means the last one has been handled
+        self._end_handling()
+        return await super().recv()
+
+    async def __aiter__(self):
+        async for message in super().__aiter__():
+            try:
+                yield message
+            finally:
+                self._end_handling()
+
+    async def close(self, *args, **kwargs):
+        self._end_handling()
+        return await self._ws.close(*args, **kwargs)
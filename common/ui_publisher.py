@@ -0,0 +1,209 @@
+import functools
+import itertools
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from common.config import UI_CONFIG
+from common.metrics import METRICS
+
+# Every browser is in the lobby; each call publishes to its own session room
+LOBBY = "lobby"
+
+# Room that log records from the current thread or task belong to
+current_room = ContextVar("current_room", default=LOBBY)
+
+
+class _Client:
+    __slots__ = ("sid", "cursors", "unacked", "last_sent", "frames_sent", "logs_dropped")
+
+    def __init__(self, sid):
+        self.sid = sid
+        # Room -> sequence number of the last event sent to this client
+        self.cursors = {}
+        self.unacked = 0
+        self.last_sent = 0.0
+        self.frames_sent = 0
+        self.logs_dropped = 0
+
+
+class UIPublisher:
+    """
+    Publishes UI events to browsers as periodic per-client frames.
+
+    Events are appended to a bounded history per room, tagged with a global
+    sequence number. Every frame_interval_ms each client is sent one
+    "ui_frame" holding only the events after its cursor in the rooms it has
+    joined. Frames are acknowledged by the browser; a client with
+    max_unacked_frames outstanding is skipped until it catches up, and when
+    it does, conversation events are all delivered but only the newest
+    max_logs_per_frame log lines are kept and the rest are counted as
+    skipped. Per-client queue depth is exported on /metrics.
+    """
+
+    def __init__(self, socketio, config=UI_CONFIG):
+        self.socketio = socketio
+        self.config = config
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._rooms = {LOBBY: deque(maxlen=config["history_size"])}
+        self._closed_rooms = {}
+        self._clients = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ui-publisher", daemon=True)
+        self._thread.start()
+        METRICS.register_collector(self._samples)
+
+    def publish(self, room, kind, payload):
+        """Queue an event of kind "conversation", "log" or "session" for a room."""
+        with self._lock:
+            events = self._rooms.get(room)
+            if events is None:
+                events = self._rooms[room] = deque(maxlen=self.config["history_size"])
+            events.append((next(self._seq), kind, payload))
+
+    def connect(self, sid):
+        with self._lock:
+            client = self._clients[sid] = _Client(sid)
+            lobby = self._rooms[LOBBY]
+            client.cursors[LOBBY] = lobby[-1][0] if lobby else 0
+
+    def disconnect(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def join(self, sid, room):
+        """Subscribe a client to a session room, replaying the room's retained history."""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is not None and room not in client.cursors:
+                client.cursors[room] = 0
+
+    def close_room(self, room):
+        """Forget a finished session's room once watchers have had time to receive it."""
+        with self._lock:
+            self._closed_rooms[room] = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.config["frame_interval_ms"] / 1000):
+            self.flush()
+
+    def flush(self):
+        now = time.monotonic()
+        frames = []
+        with self._lock:
+            for client in self._clients.values():
+                if client.unacked >= self.config["max_unacked_frames"]:
+                    if now - client.last_sent < self.config["ack_timeout_secs"]:
+                        continue
+                    # Acks were lost; resume sending
+                    client.unacked = 0
+                frame = self._build_frame(client)
+                if frame is not None:
+                    client.unacked += 1
+                    client.last_sent = now
+                    client.frames_sent += 1
+                    frames.append((client.sid, frame))
+            self._expire_rooms(now)
+
+        for sid, frame in frames:
+            try:
+                self.socketio.emit("ui_frame", frame, to=sid, callback=functools.partial(self._ack, sid))
+            except Exception as e:
+                print(f"Error emitting UI frame: {e}")
+
+    def _build_frame(self, client):
+        pending = []
+        for room, cursor in client.cursors.items():
+            events = self._rooms.get(room)
+            if not events or events[-1][0] <= cursor:
+                continue
+            for event in reversed(events):
+                if event[0] <= cursor:
+                    break
+                pending.append(event)
+            client.cursors[room] = events[-1][0]
+        if not pending:
+            return None
+
+        pending.sort()
+        frame = {"conversation": [], "logs": [], "sessions": [], "skipped_logs": 0}
+        for _, kind, payload in pending:
+            if kind == "conversation":
+                frame["conversation"].append(payload)
+            elif kind == "session":
+                frame["sessions"].append(payload)
+            else:
+                frame["logs"].append(payload)
+
+        skipped = len(frame["logs"]) - self.config["max_logs_per_frame"]
+        if skipped > 0:
+            frame["logs"] = frame["logs"][skipped:]
+            frame["skipped_logs"] = skipped
+            client.logs_dropped += skipped
+        return frame
+
+    def _expire_rooms(self, now):
+        linger = self.config["room_linger_secs"]
+        for room, closed_at in list(self._closed_rooms.items()):
+            if now - closed_at >= linger:
+                del self._closed_rooms[room]
+                self._rooms.pop(room, None)
+                for client in self._clients.values():
+                    client.cursors.pop(room, None)
+
+    def _ack(self, sid, *args):
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is not None:
+                client.unacked = max(0, client.unacked - 1)
+
+    def queue_depths(self):
+        """Return {sid: events waiting to be sent to that client}."""
+        with self._lock:
+            depths = {}
+            for client in self._clients.values():
+                depth = 0
+                for room, cursor in client.cursors.items():
+                    for event in reversed(self._rooms.get(room, ())):
+                        if event[0] <= cursor:
+                            break
+                        depth += 1
+                depths[client.sid] = depth
+            return depths
+
+    def _samples(self):
+        depths = self.queue_depths()
+        with self._lock:
+            clients = list(self._clients.values())
+        return [
+            (
+                "voice_agent_ui_client_queue_depth",
+                "gauge",
+                "UI events waiting to be sent to each browser",
+                [({"client": sid}, depth) for sid, depth in depths.items()],
+            ),
+            (
+                "voice_agent_ui_client_unacked_frames",
+                "gauge",
+                "UI frames sent to each browser and not yet acknowledged",
+                [({"client": c.sid}, c.unacked) for c in clients],
+            ),
+            (
+                "voice_agent_ui_frames_sent_total",
+                "counter",
+                "UI frames sent to each browser",
+                [({"client": c.sid}, c.frames_sent) for c in clients],
+            ),
+            (
+                "voice_agent_ui_log_lines_skipped_total",
+                "counter",
+                "Stale log lines skipped for browsers that fell behind",
+                [({"client": c.sid}, c.logs_dropped) for c in clients],
+            ),
+        ]
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,116 @@
+import numpy as np
+
+from common.config import USAGE_ANALYTICS_CONFIG
+
+
+def _daily_totals(usage_rows):
+    """(dates, total kWh, peak kWh, off-peak kWh) per day, oldest first, summed over the customer's contracts."""
+    dates, day_index = np.unique([row["date"][:10] for row in usage_rows], return_inverse=True)
+    total = np.bincount(day_index, weights=[row["total_kwh"] for row in usage_rows], minlength=len(dates))
+    peak = np.bincount(day_index, weights=[row["peak_kwh"] or 0.0 for row in usage_rows], minlength=len(dates))
+    off_peak = np.bincount(
+        day_index, weights=[row["off_peak_kwh"] or 0.0 for row in usage_rows], minlength=len(dates)
+    )
+    return dates, total, peak, off_peak
+
+
+def _monthly_bills(bills):
+    """(bill dates, kWh, amount) per billing date, oldest first, summed over the customer's contracts."""
+    dates, month_index = np.unique([bill["bill_date"][:10] for bill in bills], return_inverse=True)
+    kwh = np.bincount(month_index, weights=[bill["usage_kwh"] for bill in bills], minlength=len(dates))
+    amount = np.bincount(month_index, weights=[bill["total_amount"] for bill in bills], minlength=len(dates))
+    return dates, kwh, amount
+
+
+def _pct_change(new, old):
+    return round(100.0 * (new - old) / old, 1) if old else None
+
+
+def _zscores(values):
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def usage_insights(usage_rows, bills, contracts, config=USAGE_ANALYTICS_CONFIG):
+    """
+    Summarize a customer's daily usage, bills and contracts into a small,
+    fixed set of figures the agent can answer from directly: rolling
+    averages, the peak share, month-over-month change, anomaly flags and
+    the projected monthly saving of each plan type.
+    """
+    insights = {}
+    z_limit = config["anomaly_z"]
+
+    peak_share = None
+    if usage_rows:
+        dates, total, peak, off_peak = _daily_totals(usage_rows)
+        last_7 = total[-7:].mean()
+        prior_7 = total[-14:-7].mean() if len(total) > 7 else None
+        daily_z = _zscores(total)
+        unusual_days = np.flatnonzero(daily_z > z_limit)
+        insights["daily_kwh"] = {
+            "avg_7d": round(float(last_7), 2),
+            "avg_30d": round(float(total[-30:].mean()), 2),
+            "change_vs_prior_7d_pct": _pct_change(last_7, prior_7) if prior_7 is not None else None,
+            "highest_day": str(dates[total.argmax()]),
+            "highest_kwh": round(float(total.max()), 2),
+            "unusual_days": [str(day) for day in dates[unusual_days][-3:]],
+        }
+        split = peak + off_peak
+        if split.sum() > 0:
+            peak_share = float(peak.sum() / split.sum())
+            if off_peak.sum() > 0:
+                insights["peak_to_off_peak_ratio"] = round(float(peak.sum() / off_peak.sum()), 2)
+
+    monthly_kwh = None
+    if bills:
+        bill_dates, kwh, amount = _monthly_bills(bills)
+        monthly_kwh = float(kwh[-1])
+        previous = amount[:-1]
+        bill_z = 0.0
+        if len(previous) > 1 and previous.std() > 0:
+            bill_z = (amount[-1] - previous.mean()) / previous.std()
+        insights["bills"] = {
+            "latest_date": str(bill_dates[-1]),
+            "latest_kwh": round(monthly_kwh, 1),
+            "latest_amount": round(float(amount[-1]), 2),
+            "kwh_change_vs_previous_pct": _pct_change(kwh[-1], kwh[-2]) if len(kwh) > 1 else None,
+            "amount_change_vs_previous_pct": _pct_change(amount[-1], amount[-2]) if len(amount) > 1 else None,
+            "avg_amount": round(float(amount.mean()), 2),
+            "latest_bill_unusually_high": bool(bill_z > z_limit),
+        }
+
+    active = [c for c in contracts if c["status"] in ("Active", "Renewed")] or contracts
+    if active and monthly_kwh:
+        current_rate = float(np.average([c["rate"] for c in active], weights=[c["monthly_usage"] for c in active]))
+        insights["current_plans"] = sorted({c["plan_type"] for c in active})
+        insights["projected_monthly_saving"] = _plan_savings(
+            monthly_kwh, current_rate, peak_share if peak_share is not None else config["default_peak_share"], config
+        )
+
+    anomalies = []
+    if insights.get("daily_kwh", {}).get("unusual_days"):
+        anomalies.append("usage_spike_days")
+    if insights.get("bills", {}).get("latest_bill_unusually_high"):
+        anomalies.append("latest_bill_high")
+    if (insights.get("bills", {}).get("kwh_change_vs_previous_pct") or 0) > config["month_change_alert_pct"]:
+        anomalies.append("usage_up_vs_last_month")
+    insights["anomalies"] = anomalies
+    return insights
+
+
+def _plan_savings(monthly_kwh, current_rate, peak_share, config):
+    """Monthly saving of each plan type against the current rate, for the latest month's usage ($)."""
+    names = list(config["plan_rates"])
+    rates = np.array(
+        [
+            rate["peak"] * peak_share + rate["off_peak"] * (1 - peak_share) if isinstance(rate, dict) else rate
+            for rate in config["plan_rates"].values()
+        ]
+    )
+    savings = np.round(monthly_kwh * (current_rate - rates), 2)
+    best = int(savings.argmax())
+    return {
+        "by_plan": dict(zip(names, savings.tolist())),
+        "best_plan": names[best] if savings[best] > 0 else None,
+    }
@@ -0,0 +1,170 @@
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from common.config import VAD_CONFIG
+
+KEEPALIVE_MESSAGE = json.dumps({"type": "KeepAlive"})
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing based voice activity detector for 16-bit mono PCM.
+
+    Each microphone chunk is split into short sub-frames and the RMS level and
+    zero-crossing rate of every sub-frame are computed in one vectorized pass.
+    A chunk counts as speech when any sub-frame is loud enough, or when it is a
+    little quieter but has the zero-crossing rate of unvoiced consonants. After
+    the last speech chunk the gate stays open for the hangover period.
+    """
+
+    def __init__(self, sample_rate, chunk_secs, config=VAD_CONFIG):
+        self.config = config
+        self.sample_rate = sample_rate
+        self.chunk_secs = chunk_secs
+        self.subframe_samples = max(1, int(sample_rate * config["frame_ms"] / 1000))
+
+        self.hangover_chunks = int(round(config["hangover_ms"] / 1000 / chunk_secs))
+        self.preroll = deque(maxlen=max(0, int(round(config["preroll_ms"] / 1000 / chunk_secs))))
+
+        self.noise_floor_dbfs = config["energy_threshold_dbfs"] - config["noise_margin_db"]
+        self.is_speech = False
+        self.chunks_since_speech = None
+        self.last_onset = None
+        self.last_silence_send = time.monotonic()
+
+        self.stats = {
+            "chunks_total": 0,
+            "chunks_sent": 0,
+            "chunks_suppressed": 0,
+            "bytes_total": 0,
+            "bytes_sent": 0,
+            "keepalives_sent": 0,
+            "comfort_frames_sent": 0,
+            "onsets": 0,
+            "missed_onsets": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.config["enabled"]
+
+    def features(self, data):
+        """Return per sub-frame (rms_dbfs, zero_crossing_rate) arrays for a PCM chunk."""
+        samples = np.frombuffer(data, dtype=np.int16)
+        usable = len(samples) - len(samples) % self.subframe_samples
+        if usable == 0:
+            return np.full(1, -120.0), np.zeros(1)
+
+        frames = samples[:usable].reshape(-1, self.subframe_samples).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+        rms_dbfs = 20.0 * np.log10(np.maximum(rms, 1e-6))
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.subframe_samples - 1)
+        return rms_dbfs, zcr
+
+    def classify(self, data):
+        """Return True if the chunk contains speech and update the noise floor."""
+        rms_dbfs, zcr = self.features(data)
+        threshold = max(
+            self.config["energy_threshold_dbfs"],
+            self.noise_floor_dbfs + self.config["noise_margin_db"],
+        )
+        zcr_low, zcr_high = self.config["zcr_range"]
+
+        voiced = rms_dbfs > threshold
+        unvoiced = (
+            (rms_dbfs > threshold - self.config["zcr_energy_margin_db"])
+            & (zcr >= zcr_low)
+            & (zcr <= zcr_high)
+        )
+        speech = bool(np.any(voiced | unvoiced))
+
+        if not speech:
+            # Track the background level slowly so a noisy room raises the threshold
+            level = float(np.median(rms_dbfs))
+            self.noise_floor_dbfs += 0.05 * (level - self.noise_floor_dbfs)
+        return speech
+
+    def process(self, data):
+        """
+        Gate one microphone chunk.
+
+        Returns the list of PCM chunks to send upstream. It is empty while the
+        gate is closed, and includes the buffered pre-roll on a speech onset.
+        """
+        self.stats["chunks_total"] += 1
+        self.stats["bytes_total"] += len(data)
+
+        if self.classify(data):
+            self.chunks_since_speech = 0
+        elif self.chunks_since_speech is not None:
+            self.chunks_since_speech += 1
+
+        gate_open = (
+            self.chunks_since_speech is not None
+            and self.chunks_since_speech <= self.hangover_chunks
+        )
+
+        if not gate_open:
+            self.is_speech = False
+            self.preroll.append(data)
+            self.stats["chunks_suppressed"] += 1
+            return []
+
+        chunks = []
+        if not self.is_speech:
+            self.is_speech = True
+            self.last_onset = time.monotonic()
+            self.stats["onsets"] += 1
+            self.stats["chunks_suppressed"] -= len(self.preroll)
+            chunks.extend(self.preroll)
+            self.preroll.clear()
+        chunks.append(data)
+
+        self.stats["chunks_sent"] += len(chunks)
+        self.stats["bytes_sent"] += sum(len(chunk) for chunk in chunks)
+        self.last_silence_send = time.monotonic()
+        return chunks
+
+    def silence_message(self, chunk_size):
+        """
+        Return the message to send while the gate is closed, or None if nothing is due.
+
+        Depending on the configured silence mode this is either a JSON KeepAlive
+        or a single all-zero comfort frame, sent at most once per interval.
+        """
+        now = time.monotonic()
+        if self.config["silence_mode"] == "comfort":
+            interval = self.config["comfort_frame_interval_secs"]
+        else:
+            interval = self.config["keepalive_interval_secs"]
+        if now - self.last_silence_send < interval:
+            return None
+
+        self.last_silence_send = now
+        if self.config["silence_mode"] == "comfort":
+            self.stats["comfort_frames_sent"] += 1
+            self.stats["bytes_sent"] += chunk_size
+            return bytes(chunk_size)
+
+        self.stats["keepalives_sent"] += 1
+        self.stats["bytes_sent"] += len(KEEPALIVE_MESSAGE)
+        return KEEPALIVE_MESSAGE
+
+    def note_server_speech_start(self):
+        """Record a server-side UserStartedSpeaking; count it as missed if we never opened the gate."""
+        window = self.config["onset_window_ms"] / 1000
+        if self.is_speech:
+            return
+        if self.last_onset is None or time.monotonic() - self.last_onset > window:
+            self.stats["missed_onsets"] += 1
+
+    def bandwidth_saved(self):
+        """Return the fraction of microphone bytes that were not sent upstream."""
+        if not self.stats["bytes_total"]:
+            return 0.0
+        return 1.0 - self.stats["bytes_sent"] / self.stats["bytes_total"]
@@ -0,0 +1,30 @@
+class WebSocketWrapper:
+    """
+    Base for the layers VoiceAgent.wrap_connection puts around the agent
+    websocket. Every message sent goes through on_send and every message
+    received through on_receive, whether the caller uses recv() or
+    iterates; each hook returns the message to pass on. Anything else is
+    delegated to the wrapped websocket.
+    """
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+    def on_send(self, message):
+        return message
+
+    def on_receive(self, message):
+        return message
+
+    async def send(self, message):
+        return await self._ws.send(self.on_send(message))
+
+    async def recv(self):
+        return self.on_receive(await self._ws.recv())
+
+    async def __aiter__(self):
+        async for message in self._ws:
+            yield self.on_receive(message)
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+from urllib.parse import urlparse
+
+from client import (
+    AGENT_AUDIO_SAMPLE_RATE,
+    CONNECTION_POOL_CONFIG,
+    USER_AUDIO_SAMPLE_RATE,
+    USER_AUDIO_SAMPLES_PER_CHUNK,
+    VoiceAgent,
+    logger,
+    run_voice_agent,
+    start_connection_pool,
+)
+from common.audio_io import FileAudioTransport, StreamAudioTransport
+
+MIC_CHUNK_BYTES = 2 * USER_AUDIO_SAMPLES_PER_CHUNK
+
+
+async def serve(listen):
+    """Run one call per connection to a TCP (tcp://host:port) or Unix (unix:///path) socket."""
+    if CONNECTION_POOL_CONFIG["enabled"]:
+        await start_connection_pool()
+
+    calls = 0
+
+    async def handle(reader, writer):
+        nonlocal calls
+        calls += 1
+        agent = VoiceAgent()
+        agent.audio = StreamAudioTransport(reader, writer, MIC_CHUNK_BYTES, AGENT_AUDIO_SAMPLE_RATE, logger)
+        logger.info(f"Call {agent.room} started ({calls} so far)")
+        await run_voice_agent(agent)
+        logger.info(f"Call {agent.room} ended")
+
+    address = urlparse(listen)
+    if address.scheme == "unix":
+        server = await asyncio.start_unix_server(handle, address.path)
+    elif address.scheme == "tcp":
+        server = await asyncio.start_server(handle, address.hostname, address.port)
+    else:
+        raise SystemExit(f"Unsupported address {listen}; use tcp://host:port or unix:///path")
+
+    print(
+        f"Listening on {listen}: send 16-bit mono PCM at {USER_AUDIO_SAMPLE_RATE} Hz, "
+        f"agent audio comes back as 16-bit mono PCM at {AGENT_AUDIO_SAMPLE_RATE} Hz"
+    )
+    async with server:
+        await server.serve_forever()
+
+
+async def call_from_file(input_path, output_path, tail_secs):
+    agent = VoiceAgent()
+    agent.audio = FileAudioTransport(
+        input_path, output_path, USER_AUDIO_SAMPLE_RATE, MIC_CHUNK_BYTES, AGENT_AUDIO_SAMPLE_RATE, logger, tail_secs
+    )
+    await run_voice_agent(agent)
+    print(f"Agent audio written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run voice agent calls without a sound card: over raw PCM sockets, or from a WAV file"
+    )
+    parser.add_argument("--listen", help="tcp://host:port or unix:///path; every connection is a call")
+    parser.add_argument("--input", help="16-bit WAV file played as the caller")
+    parser.add_argument("--output", default="agent_audio.wav", help="Where the agent's audio is written with --input")
+    parser.add_argument(
+        "--tail-secs", type=float, default=10.0, help="Silence after the input file before hanging up"
+    )
+    args = parser.parse_args()
+
+    if bool(args.listen) == bool(args.input):
+        parser.error("give exactly one of --listen or --input")
+    try:
+        if args.listen:
+            asyncio.run(serve(args.listen))
+        else:
+            asyncio.run(call_from_file(args.input, args.output, args.tail_secs))
+    except KeyboardInterrupt:
+        pass
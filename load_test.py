@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# The mock server accepts any key
+os.environ.setdefault("DEEPGRAM_API_KEY", "load-test")
+
+from client import (
+    AGENT_AUDIO_BYTES_PER_SEC,
+    USER_AUDIO_SAMPLE_RATE,
+    USER_AUDIO_SAMPLES_PER_CHUNK,
+    USER_AUDIO_SECS_PER_CHUNK,
+    VoiceAgent,
+    logger,
+)
+from common.audio_io import load_wav
+from common.metrics import LatencySummary
+from mock_agent_server import SCENARIOS
+
+
+def synthetic_speech(seconds=20.0, speech_secs=1.5, pause_secs=2.0):
+    """Microphone PCM: bursts of a noisy voiced tone separated by near silence."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * USER_AUDIO_SAMPLE_RATE)) / USER_AUDIO_SAMPLE_RATE
+    voiced = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 360 * t)
+    voiced += 0.02 * rng.standard_normal(len(t))
+    speaking = (t % (speech_secs + pause_secs)) < speech_secs
+    pcm = voiced * speaking + 0.0005 * rng.standard_normal(len(t))
+    return (np.clip(pcm, -1, 1) * 32767).astype(np.int16)
+
+
+class NullSpeaker:
+    """
+    Stands in for Speaker without an output device: audio is accounted as if
+    it played in real time (scaled by the mock server's speed), so pacing
+    and farewell waits behave as they would on a real call.
+    """
+
+    def __init__(self, speed):
+        self.speed = speed if speed > 0 else float("inf")
+        self._playing_until = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def play(self, data):
+        now = time.monotonic()
+        self._playing_until = max(now, self._playing_until) + len(data) / AGENT_AUDIO_BYTES_PER_SEC / self.speed
+
+    def audio_done(self):
+        pass
+
+    def remaining_playback_secs(self):
+        return max(0.0, self._playing_until - time.monotonic())
+
+    def stop(self):
+        self._playing_until = 0.0
+
+
+class SimulatedCaller(VoiceAgent):
+    """A VoiceAgent fed with looping PCM instead of a microphone, and a NullSpeaker."""
+
+    def __init__(self, url, pcm, speed):
+        super().__init__()
+        self.url = url
+        self.speed = speed
+        self.turn_stages = []
+        self._mic_audio = pcm.tobytes()
+        self._mic_task = None
+
+    def create_speaker(self):
+        return NullSpeaker(self.speed)
+
+    async def start_microphone(self):
+        self._mic_task = asyncio.create_task(self._feed_microphone())
+        return None, None
+
+    async def _feed_microphone(self):
+        """Queue chunks on the same real-time schedule as the sounddevice callback."""
+        loop = asyncio.get_running_loop()
+        chunk_bytes = 2 * USER_AUDIO_SAMPLES_PER_CHUNK
+        chunks = len(self._mic_audio) // chunk_bytes
+        start, i = loop.time(), 0
+        while self.is_running:
+            offset = (i % chunks) * chunk_bytes
+            await self.mic_audio_queue.put(self._mic_audio[offset : offset + chunk_bytes])
+            i += 1
+            await asyncio.sleep(max(0.0, start + i * USER_AUDIO_SECS_PER_CHUNK - loop.time()))
+
+    def cleanup(self):
+        if self._mic_task:
+            self._mic_task.cancel()
+
+    def finish_turn(self):
+        stages = super().finish_turn()
+        if stages:
+            self.turn_stages.append(stages)
+        return stages
+
+
+def quantiles(values):
+    summary = LatencySummary(max(1, len(values)))
+    for value in values:
+        summary.observe(value)
+    return summary.quantiles()
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # macOS reports the peak in bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def monitor(lags, rss_peak, interval=0.05):
+    """Sample event loop lag (how late a sleep wakes up) and peak RSS."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - started - interval))
+        rss_peak[0] = max(rss_peak[0], rss_bytes())
+
+
+async def run_step(concurrency, base_url, scenarios, pcm, speed, stagger):
+    """Run one call per caller with this many callers at once and return the step's measurements."""
+    callers = [
+        SimulatedCaller(f"{base_url}/{scenarios[i % len(scenarios)]}", pcm, speed) for i in range(concurrency)
+    ]
+
+    async def run_caller(i, caller):
+        await asyncio.sleep(stagger * i / concurrency)
+        await caller.run()
+
+    lags, rss_peak = [], [rss_bytes()]
+    monitor_task = asyncio.create_task(monitor(lags, rss_peak))
+    rss_before, cpu_before, started = rss_bytes(), cpu_seconds(), time.perf_counter()
+    await asyncio.gather(*(run_caller(i, caller) for i, caller in enumerate(callers)))
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_before
+    monitor_task.cancel()
+
+    turns = [stages for caller in callers for stages in caller.turn_stages]
+    turn_latency = quantiles([s["user_to_first_audio"] for s in turns if "user_to_first_audio" in s])
+    function_latency = quantiles([s["function_execution"] for s in turns if "function_execution" in s])
+    lag = quantiles(lags)
+    # Calls that hung up with end_call or closed normally, not ones that only connected
+    completed = sum(1 for caller in callers if caller.ended is not None)
+    return {
+        "concurrency": concurrency,
+        "calls_completed": completed,
+        "wall_secs": wall,
+        "calls_per_min": 60 * completed / wall,
+        "turns_per_sec": len(turns) / wall,
+        "turn_p50": turn_latency[0.5],
+        "turn_p99": turn_latency[0.99],
+        "function_p99": function_latency[0.99],
+        "loop_lag_p99": lag[0.99],
+        "loop_lag_max": max(lags, default=0.0),
+        "cpu_percent": 100 * cpu / wall,
+        "cpu_secs_per_call": cpu / concurrency,
+        "rss_mb": rss_peak[0] / 2**20,
+        "rss_mb_per_session": max(0, rss_peak[0] - rss_before) / 2**20 / concurrency,
+    }
+
+
+def print_report(results):
+    print(
+        f"\n{'calls':>5} {'done':>5} {'calls/min':>9} {'turns/s':>7} {'turn p50':>8} {'turn p99':>8} "
+        f"{'func p99':>8} {'lag p99':>8} {'lag max':>8} {'cpu %':>6} {'cpu s/call':>10} "
+        f"{'rss MB':>7} {'MB/call':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['calls_completed']:>5} {r['calls_per_min']:>9.1f} {r['turns_per_sec']:>7.2f} "
+            f"{r['turn_p50']:>8.3f} {r['turn_p99']:>8.3f} {r['function_p99']:>8.3f} {r['loop_lag_p99']:>8.3f} "
+            f"{r['loop_lag_max']:>8.3f} {r['cpu_percent']:>6.1f} {r['cpu_secs_per_call']:>10.3f} "
+            f"{r['rss_mb']:>7.1f} {r['rss_mb_per_session']:>7.2f}"
+        )
+    print("\nTurn latency is user stopped speaking -> first agent audio, including the mock server's scripted think time.")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(port, speed):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_agent_server.py"), "--port", str(port), "--speed", str(speed)],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Mock agent server did not start")
+
+
+async def main(args):
+    pcm = load_wav(args.pcm, USER_AUDIO_SAMPLE_RATE) if args.pcm else synthetic_speech()
+    results = []
+    for concurrency in args.concurrency:
+        print(f"Running {concurrency} concurrent calls...")
+        results.append(await run_step(concurrency, args.url, args.scenarios, pcm, args.speed, args.stagger))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp up simulated callers against a local mock agent server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 25], help="Callers per step")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS), help="Scripted calls to cycle through"
+    )
+    parser.add_argument("--pcm", help="16-bit WAV file used as caller audio; default is synthetic speech")
+    parser.add_argument("--speed", type=float, default=1.0, help="Mock server speed factor")
+    parser.add_argument("--stagger", type=float, default=1.0, help="Seconds over which each step's calls start")
+    parser.add_argument("--url", help="Use an already running mock server (e.g. ws://localhost:8765)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-message session logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    server = None
+    if not args.url:
+        port = free_port()
+        server = start_mock_server(port, args.speed)
+        args.url = f"ws://localhost:{port}"
+    try:
+        results = asyncio.run(main(args))
+    finally:
+        if server:
+            server.terminate()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import websockets
+
+from common import mulaw
+from common.session_recording import load_recording
+from common.tracing import message_type
+
+# Client messages a replay waits for before sending what the server sent next
+BARRIER_TYPES = {"SettingsConfiguration", "FunctionCallResponse", "InjectAgentMessage"}
+
+# How long a scripted call waits for an InjectAgentMessage before carrying on without
+# the injected speech (the client played the phrase itself, e.g. from its phrase cache)
+INJECT_WAIT_SECS = 1.0
+
+# Scripted agent audio is streamed in chunks of this length, at twice real time
+SCRIPT_AUDIO_CHUNK_SECS = 0.1
+
+
+class Script:
+    """
+    Builds a session in the recording format (see common.session_recording).
+    Without fillers the agent never calls agent_filler, as when the client is
+    not offering it, and the filler speech is left out too.
+    """
+
+    def __init__(self, sample_rate, encoding="linear16", fillers=True):
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.fillers = fillers
+        self.t = 0.0
+        self.events = []
+        self._skip_injected_speech = False
+
+    def server(self, delay, **message):
+        self.t += delay
+        self.events.append(
+            {"t": self.t, "direction": "server", "type": message["type"], "text": json.dumps(message)}
+        )
+
+    def client(self, delay, message_type, optional=False):
+        self.t += delay
+        event = {"t": self.t, "direction": "client", "type": message_type}
+        if optional:
+            event["optional"] = True
+        self.events.append(event)
+
+    def speak(self, content, seconds, injected=False):
+        """
+        Agent turn: text, AgentStartedSpeaking, a quiet tone as audio, then
+        AgentAudioDone. Injected speech is only sent if the client injected it.
+        """
+        if injected and self._skip_injected_speech:
+            self._skip_injected_speech = False
+            return
+        first = len(self.events)
+        self.server(0.3, type="ConversationText", role="assistant", content=content)
+        self.server(0.05, type="AgentStartedSpeaking")
+        samples_per_chunk = int(self.sample_rate * SCRIPT_AUDIO_CHUNK_SECS)
+        t = np.arange(int(self.sample_rate * seconds)) / self.sample_rate
+        audio = (1000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+        for start in range(0, len(audio), samples_per_chunk):
+            self.t += SCRIPT_AUDIO_CHUNK_SECS / 2
+            chunk = audio[start : start + samples_per_chunk].tobytes()
+            if self.encoding == "mulaw":
+                chunk = mulaw.encode(chunk)
+            self.events.append({"t": self.t, "direction": "server", "audio": chunk})
+        self.server(0.05, type="AgentAudioDone")
+        if injected:
+            for event in self.events[first:]:
+                event["injected"] = True
+
+    def user_turn(self, content):
+        self.server(1.0, type="UserStartedSpeaking")
+        self.server(1.5, type="ConversationText", role="user", content=content)
+        self.server(0.1, type="EndOfThought")
+
+    def function_call(self, function_name, parameters, injects_message=False):
+        if function_name == "agent_filler" and not self.fillers:
+            self._skip_injected_speech = True
+            return
+        self.server(0.4, type="FunctionCalling")
+        self.server(
+            0.05,
+            type="FunctionCallRequest",
+            function_name=function_name,
+            function_call_id=f"call_{len(self.events)}",
+            input=parameters,
+        )
+        self.client(0.1, "FunctionCallResponse")
+        if injects_message:
+            self.client(0.0, "InjectAgentMessage", optional=True)
+
+
+GREETING = "Hello! I'm Michelle from PacificLight customer service. How can I help you with your energy needs today?"
+
+
+def lookup_scenario(script):
+    """Greeting, a customer lookup with filler, then end_call."""
+    script.speak(GREETING, 3.0)
+    script.user_turn("Hi, can you check my account? My customer ID is zero.")
+    script.function_call("agent_filler", {"message_type": "lookup"}, injects_message=True)
+    script.speak("Let me look that up for you.", 1.0, injected=True)
+    script.function_call("find_customer", {"customer_id": "CUST0000"})
+    script.speak("Thanks, I've found your account. What would you like to know?", 2.5)
+    script.user_turn("That's all, thank you.")
+    script.function_call("end_call", {"farewell_type": "thanks"}, injects_message=True)
+    script.speak("Thank you for calling! Have a great day!", 2.0, injected=True)
+
+
+def billing_scenario(script):
+    """Lookup, then billing history and usage in separate turns."""
+    script.speak(GREETING, 3.0)
+    script.user_turn("What was my last electricity bill? I'm customer one.")
+    script.function_call("agent_filler", {"message_type": "lookup"}, injects_message=True)
+    script.speak("Let me look that up for you.", 1.0, injected=True)
+    script.function_call("find_customer", {"customer_id": "CUST0001"})
+    script.function_call("get_billing_history", {"customer_id": "CUST0001"})
+    script.speak("Your last bill was for March and has been paid.", 3.0)
+    script.user_turn("And how much energy did I use this month?")
+    script.function_call("get_usage_data", {"customer_id": "CUST0001", "days": 30})
+    script.speak("You used about three hundred kilowatt hours over the last thirty days.", 3.5)
+    script.user_turn("Great, thanks.")
+    script.function_call("end_call", {"farewell_type": "help"}, injects_message=True)
+    script.speak("I'm glad I could help! Have a wonderful day!", 2.0, injected=True)
+
+
+def appointment_scenario(script):
+    """Lookup, availability check and booking."""
+    start = (datetime.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+    script.speak(GREETING, 3.0)
+    script.user_turn("I'd like to book a bill review. My customer ID is two.")
+    script.function_call("find_customer", {"customer_id": "CUST0002"})
+    script.function_call("check_availability", {"start_date": start.isoformat()})
+    script.speak("I have a slot available on that morning at ten. Shall I book it?", 3.0)
+    script.user_turn("Yes please.")
+    script.function_call(
+        "create_appointment", {"customer_id": "CUST0002", "date": start.isoformat(), "service": "Bill Review"}
+    )
+    script.speak("You're booked in for a bill review.", 2.0)
+    script.user_turn("Thanks, bye.")
+    script.function_call("end_call", {"farewell_type": "general"}, injects_message=True)
+    script.speak("Goodbye! Have a nice day!", 1.5, injected=True)
+
+
+# Scripted calls, selected by the path of the websocket URL (e.g. ws://localhost:8765/billing)
+SCENARIOS = {
+    "lookup": lookup_scenario,
+    "billing": billing_scenario,
+    "appointment": appointment_scenario,
+}
+
+
+def scripted_session(scenario, sample_rate, encoding="linear16", fillers=True):
+    script = Script(sample_rate, encoding, fillers)
+    SCENARIOS[scenario](script)
+    return script.events
+
+
+class SessionPlayer:
+    """
+    Plays server events to one connected client.
+
+    Events keep their recorded spacing divided by speed (0 sends as fast as
+    possible). At each recorded client barrier the player waits until the
+    live client has sent as many messages of that type, and later events are
+    timed from the moment it did, so replays stay in step with the client's
+    own function execution.
+    """
+
+    def __init__(self, ws, speed, barrier_timeout):
+        self.ws = ws
+        self.speed = speed
+        self.barrier_timeout = barrier_timeout
+        self.client_counts = Counter()
+        self.client_audio_bytes = 0
+        self.barrier_waits = []
+        self._arrived = asyncio.Condition()
+        self._settings = asyncio.get_running_loop().create_future()
+
+    async def read_client(self):
+        async for message in self.ws:
+            if isinstance(message, bytes):
+                self.client_audio_bytes += len(message)
+                continue
+            received_type = message_type(message)
+            if received_type == "SettingsConfiguration" and not self._settings.done():
+                self._settings.set_result(json.loads(message))
+            async with self._arrived:
+                self.client_counts[received_type] += 1
+                self._arrived.notify_all()
+
+    async def settings(self):
+        return await self._settings
+
+    async def play(self, events):
+        loop = asyncio.get_running_loop()
+        barriers = Counter()
+        base_wall, base_t = loop.time(), 0.0
+        skip_injected = False
+        for event in events:
+            if event["direction"] == "client":
+                if event["type"] not in BARRIER_TYPES:
+                    continue
+                barriers[event["type"]] += 1
+                needed = barriers[event["type"]]
+                waited_from = loop.time()
+                skip_injected = False
+                async with self._arrived:
+                    try:
+                        await asyncio.wait_for(
+                            self._arrived.wait_for(lambda: self.client_counts[event["type"]] >= needed),
+                            min(self.barrier_timeout, INJECT_WAIT_SECS) if event.get("optional") else self.barrier_timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        if event.get("optional"):
+                            # Later messages of this type are counted from here
+                            barriers[event["type"]] -= 1
+                            skip_injected = True
+                        else:
+                            print(f"Timed out waiting for client {event['type']} #{needed}; continuing")
+                self.barrier_waits.append((event["type"], loop.time() - waited_from))
+                base_wall, base_t = loop.time(), event["t"]
+                continue
+
+            if skip_injected and event.get("injected"):
+                # Speech the client did not ask for takes no time
+                base_wall, base_t = loop.time(), event["t"]
+                continue
+
+            if self.speed > 0:
+                delay = base_wall + (event["t"] - base_t) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self.ws.send(event["audio"] if "audio" in event else event["text"])
+
+
+def make_handler(recording, speed, barrier_timeout, default_scenario="lookup"):
+    async def handler(ws):
+        started = time.time()
+        player = SessionPlayer(ws, speed, barrier_timeout)
+        reader = asyncio.create_task(player.read_client())
+        try:
+            if recording is not None:
+                events = recording
+            else:
+                await ws.send(json.dumps({"type": "Welcome", "session_id": f"mock-{os.urandom(4).hex()}"}))
+                settings = await player.settings()
+                output = settings.get("audio", {}).get("output", {})
+                functions = settings.get("agent", {}).get("think", {}).get("functions", [])
+                scenario = ws.path.strip("/") or default_scenario
+                events = scripted_session(
+                    scenario if scenario in SCENARIOS else default_scenario,
+                    output.get("sample_rate", 16000),
+                    output.get("encoding", "linear16"),
+                    fillers=any(function.get("name") == "agent_filler" for function in functions),
+                )
+            await player.play(events)
+            # The client closes the connection once the farewell has played
+            await reader
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            reader.cancel()
+            responses = [wait for kind, wait in player.barrier_waits if kind == "FunctionCallResponse"]
+            print(
+                f"Session done in {time.time() - started:.2f}s: "
+                f"{len(responses)} function responses "
+                f"(avg wait {sum(responses) / len(responses) if responses else 0.0:.3f}s), "
+                f"{player.client_audio_bytes} bytes of client audio"
+            )
+
+    return handler
+
+
+async def serve(host, port, recording, speed, barrier_timeout, scenario):
+    handler = make_handler(recording, speed, barrier_timeout, scenario)
+    async with websockets.serve(handler, host, port, max_size=None):
+        print(f"Mock Voice Agent API listening on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Voice Agent API. Plays a scripted call, or replays a "
+        "session recorded with RECORDING_CONFIG enabled in common/config.py."
+    )
+    parser.add_argument("--recording", help="Recorded session (.jsonl) to replay; default is a scripted call")
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), default="lookup", help="Scripted call used when the URL has no path"
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor; 0 sends as fast as possible")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--barrier-timeout", type=float, default=30.0, help="Seconds to wait for a client response before moving on"
+    )
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording) if args.recording else None
+    try:
+        asyncio.run(serve(args.host, args.port, recording, args.speed, args.barrier_timeout, args.scenario))
+    except KeyboardInterrupt:
+        pass
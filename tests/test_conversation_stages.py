@@ -0,0 +1,34 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    # Importing the business logic writes mock data to the working directory
+    monkeypatch.chdir(tmp_path)
+    conversation_stages = importlib.import_module("common.conversation_stages")
+    stages = conversation_stages.ConversationStages(config={"enabled": True, "chars_per_token": 4})
+    stages.observe_user_text("I have a question about my bill")
+    stages.observe_result("find_customer", {"customer_id": "CUST0001"})
+    return stages
+
+
+@pytest.mark.parametrize("text", ["Yes, that's right.", "Okay, thank you very much.", "No that is all", "Great"])
+def test_acknowledgements_keep_the_stage(stages, text):
+    assert not stages.observe_user_text(text)
+    assert stages.stage == "billing"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "What is my current balance?",
+        "how much did I spend last month",
+        "I need someone to fix my meter",
+        "Do I have anything coming up?",
+    ],
+)
+def test_unrecognised_requests_unlock_every_tool(stages, text):
+    assert stages.observe_user_text(text)
+    assert stages.stage == "all"
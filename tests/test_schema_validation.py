@@ -0,0 +1,21 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def schema_validation(tmp_path, monkeypatch):
+    # Importing the business logic writes mock data to the working directory
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("common.schema_validation")
+
+
+def test_integral_floats_are_accepted_as_integers(schema_validation):
+    params = {"customer_id": "CUST0001", "days": 30.0}
+    assert schema_validation.VALIDATORS["get_usage_data"](params) == []
+    assert params["days"] == 30 and isinstance(params["days"], int)
+
+
+@pytest.mark.parametrize("days", [30.5, "30", True])
+def test_non_integers_are_rejected(schema_validation, days):
+    assert schema_validation.VALIDATORS["get_usage_data"]({"customer_id": "CUST0001", "days": days})
@@ -0,0 +1,79 @@
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from common.config import TRACE_CONFIG
+
+
+def load_spans(path):
+    """Read spans from the trace file and its rotated backups."""
+    spans = []
+    for file in sorted(glob.glob(f"{path}*")):
+        with open(file, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    spans.append(json.loads(line))
+    return spans
+
+
+def summarize(spans, top):
+    """Print the slowest turns with their stage breakdown and the functions they called."""
+    functions_by_trace = defaultdict(list)
+    sessions = {}
+    turns = []
+    for span in spans:
+        trace_id = span["context"]["trace_id"]
+        if span["name"] == "function.call":
+            functions_by_trace[trace_id].append(span)
+        elif span["name"] == "voice_agent.session":
+            sessions[trace_id] = span
+        elif span["name"] == "voice_agent.turn":
+            turns.append(span)
+
+    def turn_latency(span):
+        attributes = span["attributes"]
+        return attributes.get("stage.user_to_first_audio", attributes.get("stage.response_to_first_audio", 0.0))
+
+    turns.sort(key=turn_latency, reverse=True)
+
+    print(f"{len(sessions)} calls, {len(turns)} turns, "
+          f"{sum(len(f) for f in functions_by_trace.values())} function calls")
+    print(f"\nSlowest {min(top, len(turns))} turns (user stopped speaking -> first agent audio):\n")
+
+    for span in turns[:top]:
+        trace_id = span["context"]["trace_id"]
+        attributes = span["attributes"]
+        started = datetime.fromtimestamp(span["start_time_unix_nano"] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+        session_id = sessions.get(trace_id, {}).get("attributes", {}).get("session.id")
+        print(f"{turn_latency(span):7.3f}s  {started}  trace {trace_id[:12]}  session {session_id}")
+
+        for key, value in attributes.items():
+            if key.startswith("stage.") and key != "stage.user_to_first_audio":
+                print(f"          {key[6:]:<24} {value:.3f}s")
+
+        for function_span in functions_by_trace[trace_id]:
+            if span["start_time_unix_nano"] <= function_span["start_time_unix_nano"] <= span["end_time_unix_nano"]:
+                duration = (function_span["end_time_unix_nano"] - function_span["start_time_unix_nano"]) / 1e9
+                function_attributes = function_span["attributes"]
+                print(
+                    f"          function {function_attributes['function.name']:<15} {duration:.3f}s "
+                    f"({function_attributes.get('function.payload_bytes', 0)} bytes)"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the slowest turns in voice agent traces")
+    parser.add_argument("path", nargs="?", default=TRACE_CONFIG["path"], help="Trace JSONL file")
+    parser.add_argument("--top", type=int, default=10, help="Number of turns to show")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Error: trace file {args.path} not found.")
+        raise SystemExit(1)
+
+    summarize(load_spans(args.path), args.top)